@@ -0,0 +1,47 @@
+"""
+Save latency against file size for each compression level, on a large sheet:
+
+    python -m benchmarks.compression
+    python -m benchmarks.compression --workload wide --scale 2
+"""
+import argparse
+import sys
+import time
+from io import BytesIO
+
+from openpyxl import Workbook
+
+from benchmarks.generators import WORKLOADS
+from tablepyxl.tablepyxl import document_to_workbook, save_workbook
+
+LEVELS = (0, 1, 3, 6, 9)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workload', default='tall_narrow', choices=sorted(WORKLOADS))
+    parser.add_argument('--scale', type=float, default=2.0, help='size of the generated document')
+    parser.add_argument('--repeat', type=int, default=3, help='saves per level, the fastest is kept')
+    args = parser.parse_args(argv)
+
+    doc = WORKLOADS[args.workload](args.scale)
+    wb = Workbook()
+    wb.remove(wb.active)
+    document_to_workbook(doc, wb=wb)
+
+    print('{:<8}{:>12}{:>12}'.format('level', 'seconds', 'kb'))
+    for level in LEVELS:
+        best, size = None, None
+        for _ in range(args.repeat):
+            output = BytesIO()
+            start = time.perf_counter()
+            save_workbook(wb, output, compresslevel=level)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+            size = output.tell()
+        print('{:<8}{:>12.3f}{:>12.1f}'.format(level, best, size / 1024))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
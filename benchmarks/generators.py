@@ -0,0 +1,111 @@
+"""
+Synthetic html documents for the benchmarks. Each generator takes a scale factor so the same
+workloads can be run quickly or at full size, and is deterministic so runs are comparable.
+"""
+import random
+
+STYLESHEET = """
+<style>
+  table.report { border: 1px solid #000000; }
+  .header { font-weight: bold; background-color: #cccccc; text-align: center; }
+  .odd { background-color: #f5f5f5; }
+  .even { background-color: #ffffff; }
+  .num { text-align: right; color: navy; }
+  .neg { color: red; }
+  .total td { font-weight: bold; border-top: 2px solid #000000; }
+  #summary td.num { font-style: italic; }
+</style>
+"""
+
+
+def _document(body, head=''):
+    return '<html><head>{}</head><body>{}</body></html>'.format(head, body)
+
+
+def _row(cells, attributes=''):
+    return '<tr{}>{}</tr>'.format(attributes, ''.join(cells))
+
+
+def tall_narrow(scale=1.0):
+    rows = int(20000 * scale)
+    body = ''.join(_row(['<td>{}</td>'.format(i), '<td>item {}</td>'.format(i % 97),
+                         '<td class="TYPE_NUMERIC">{:,}</td>'.format(i * 37)]) for i in range(rows))
+    return _document('<table border="1">{}</table>'.format(body))
+
+
+def wide(scale=1.0):
+    rows, columns = int(200 * scale), 100
+    header = _row(['<th>column {}</th>'.format(c) for c in range(columns)])
+    body = ''.join(_row(['<td>{}.{}</td>'.format(r, c) for c in range(columns)]) for r in range(rows))
+    return _document('<table>{}{}</table>'.format(header, body))
+
+
+def styled(scale=1.0):
+    rng = random.Random(13)
+    rows, columns = int(2000 * scale), 10
+    header = _row(['<td class="header">heading {}</td>'.format(c) for c in range(columns)])
+    body = []
+    for r in range(rows):
+        cells = []
+        for c in range(columns):
+            value = rng.randint(-5000, 5000)
+            cells.append('<td class="num{}">{}</td>'.format(' neg' if value < 0 else '', value))
+        body.append(_row(cells, ' class="{}"'.format('odd' if r % 2 else 'even')))
+    total = _row(['<td class="num">{}</td>'.format(c) for c in range(columns)], ' class="total"')
+    table = '<table class="report" id="summary">{}{}{}</table>'.format(header, ''.join(body), total)
+    return _document(table, head=STYLESHEET)
+
+
+def spans(scale=1.0):
+    groups, group_rows, columns = int(500 * scale), 4, 10
+    body = []
+    for g in range(groups):
+        for i in range(group_rows):
+            cells = ['<td rowspan="{}">group {}</td>'.format(group_rows, g)] if i == 0 else []
+            cells.append('<td colspan="3">section {}</td>'.format(i))
+            cells.extend('<td>{}</td>'.format(c) for c in range(columns))
+            body.append(_row(cells))
+    return _document('<table border="1">{}</table>'.format(''.join(body)))
+
+
+def rich_text(scale=1.0):
+    rows, columns = int(2000 * scale), 5
+    cell = ('<td>plain <b>bold <font color="red">red bold</font></b> and '
+            '<font size="14" color="#0000ff">big blue <b>{}</b></font></td>')
+    body = ''.join(_row([cell.format(r * columns + c) for c in range(columns)]) for r in range(rows))
+    return _document('<table>{}</table>'.format(body))
+
+
+def many_small(scale=1.0):
+    tables, rows, columns = int(500 * scale), 5, 4
+    table = '<table border="1"><tr>{}</tr>{}</table>'.format(
+        ''.join('<th>h{}</th>'.format(c) for c in range(columns)),
+        ''.join(_row(['<td>{}</td>'.format(r * columns + c) for c in range(columns)]) for r in range(rows)))
+    return _document(table * tables)
+
+
+def many_styles(scale=1.0):
+    rng = random.Random(17)
+    rows, columns = int(300 * scale), 10
+    body = []
+    for r in range(rows):
+        cells = []
+        for c in range(columns):
+            # Thousands of distinct combinations, each one a cell style of its own
+            style = 'background-color: #{:02x}{:02x}{:02x}; font-size: {}px{}'.format(
+                rng.randrange(0, 256, 16), rng.randrange(0, 256, 16), rng.randrange(0, 256, 16),
+                rng.choice((10, 11, 12, 14)), '; font-weight: bold' if rng.random() < 0.5 else '')
+            cells.append('<td style="{}">{}</td>'.format(style, r * columns + c))
+        body.append(_row(cells))
+    return _document('<table>{}</table>'.format(''.join(body)))
+
+
+WORKLOADS = {
+    'tall_narrow': tall_narrow,
+    'wide': wide,
+    'styled': styled,
+    'spans': spans,
+    'rich_text': rich_text,
+    'many_small': many_small,
+    'many_styles': many_styles,
+}
@@ -0,0 +1,152 @@
+"""
+Times each stage of a conversion for the synthetic workloads and compares them to a stored
+baseline. Run from the repository root:
+
+    python -m benchmarks.run                    # all workloads, checked against the baseline
+    python -m benchmarks.run spans --scale 0.2  # one workload, smaller
+    python -m benchmarks.run --save             # store the results as the new baseline
+
+Baselines are only comparable on the machine they were recorded on. The exit status is 1 when a
+stage is slower, or a workload's peak memory higher, than the baseline by more than the threshold.
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import tracemalloc
+from collections import OrderedDict
+from io import BytesIO
+
+from benchmarks.generators import WORKLOADS
+from tablepyxl import css
+from tablepyxl.stats import ConversionStats
+from tablepyxl.tablepyxl import document_to_xl
+
+BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+# Linked stylesheets are inlined by Premailer, which only fetches them over http: the workloads
+# have none, so there is no inline stage to time
+STAGES = ('parse', 'stylesheet', 'tables', 'write', 'save')
+# Differences below this many seconds are noise, whatever the ratio
+NOISE_FLOOR = 0.005
+
+
+class Peaks(object):
+    """
+    An observer recording, when tracemalloc is tracing, the peak memory allocated during each stage.
+    """
+
+    def __init__(self):
+        self.peaks = OrderedDict()
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+
+    def __call__(self, stage, seconds, stats):
+        if tracemalloc.is_tracing():
+            self.peaks[stage] = max(self.peaks.get(stage, 0), tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+
+
+def convert(doc, observer=None):
+    """
+    The stage timings of a conversion through document_to_xl.
+    """
+    # Every run starts from a cold stylesheet, as a new document would
+    css._compiled_stylesheets.clear()
+    stats = ConversionStats(observer)
+    document_to_xl(doc, BytesIO(), stats=stats)
+    return stats.timings
+
+
+def benchmark(doc, repeat=3):
+    """
+    The best time of each stage over the repeats, and the peak memory of a separate traced run.
+    """
+    times = {}
+    for _ in range(repeat):
+        # Garbage left by the previous run would otherwise be collected during this one
+        gc.collect()
+        for name, elapsed in convert(doc).items():
+            times[name] = min(times.get(name, elapsed), elapsed)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        peaks = Peaks()
+        convert(doc, peaks)
+    finally:
+        tracemalloc.stop()
+
+    result = OrderedDict((name, round(times.get(name, 0), 4)) for name in STAGES)
+    result['total'] = round(sum(times.values()), 4)
+    result['peak_mb'] = round(max(peaks.peaks.values()) / 2 ** 20, 2)
+    return result
+
+
+def regressions(results, baseline, threshold):
+    for workload, result in results.items():
+        expected = baseline.get(workload)
+        if not expected:
+            continue
+        for measure, value in result.items():
+            base = expected.get(measure)
+            if base is None:
+                continue
+            floor = NOISE_FLOOR if measure != 'peak_mb' else 0
+            if value > base * (1 + threshold) and value - base > floor:
+                yield workload, measure, base, value
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('workloads', nargs='*',
+                        help='workloads to run, all of them by default: {}'.format(', '.join(sorted(WORKLOADS))))
+    parser.add_argument('--scale', type=float, default=1.0, help='size of the generated documents')
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per workload, the best is kept')
+    parser.add_argument('--baseline', default=BASELINE, help='baseline file to compare with or save to')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='allowed slowdown over the baseline, as a fraction')
+    parser.add_argument('--save', action='store_true', help='save the results as the baseline')
+    args = parser.parse_args(argv)
+    unknown = set(args.workloads) - set(WORKLOADS)
+    if unknown:
+        parser.error('unknown workloads: {}'.format(', '.join(sorted(unknown))))
+
+    results = OrderedDict()
+    print('{:<12}'.format('workload') + ''.join('{:>11}'.format(m) for m in STAGES + ('total', 'peak_mb')))
+    # Always in the same order, earlier workloads leave the interpreter in a different state
+    for name in sorted(args.workloads or WORKLOADS):
+        result = results[name] = benchmark(WORKLOADS[name](args.scale), repeat=args.repeat)
+        print('{:<12}'.format(name) + ''.join('{:>11}'.format(value) for value in result.values()))
+
+    if args.save:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        if baseline.get('scale', args.scale) != args.scale:
+            baseline = {}
+        baseline['scale'] = args.scale
+        baseline.setdefault('workloads', {}).update(results)
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2)
+        print('Saved baseline to {}'.format(args.baseline))
+        return 0
+
+    if not os.path.exists(args.baseline):
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get('scale') != args.scale:
+        print('Baseline was recorded at scale {}, not compared'.format(baseline.get('scale')))
+        return 0
+
+    failed = False
+    for workload, measure, base, value in regressions(results, baseline['workloads'], args.threshold):
+        failed = True
+        print('REGRESSION {} {}: {} -> {}'.format(workload, measure, base, value))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
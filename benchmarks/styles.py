@@ -0,0 +1,57 @@
+"""
+Write time, save time and file size with cells styled directly against cells referring to a
+named style per distinct style:
+
+    python -m benchmarks.styles
+    python -m benchmarks.styles styled --scale 2
+"""
+import argparse
+import sys
+import time
+from io import BytesIO
+
+from benchmarks.generators import WORKLOADS
+from tablepyxl.tablepyxl import document_to_workbook, new_workbook, save_workbook
+
+MODES = (('direct', False), ('named', True))
+
+
+def measure(doc, named_styles, repeat):
+    best_write, best_save, size, styles = None, None, None, None
+    for _ in range(repeat):
+        wb = new_workbook()
+        start = time.perf_counter()
+        document_to_workbook(doc, wb=wb, named_styles=named_styles)
+        written = time.perf_counter()
+        output = BytesIO()
+        save_workbook(wb, output)
+        saved = time.perf_counter()
+        best_write = written - start if best_write is None else min(best_write, written - start)
+        best_save = saved - written if best_save is None else min(best_save, saved - written)
+        size = output.tell()
+        styles = len(wb._named_styles) - 1
+    return best_write, best_save, size, styles
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('workloads', nargs='*',
+                        help='workloads to run, all of them by default: {}'.format(', '.join(sorted(WORKLOADS))))
+    parser.add_argument('--scale', type=float, default=1.0, help='size of the generated documents')
+    parser.add_argument('--repeat', type=int, default=3, help='conversions per mode, the fastest is kept')
+    args = parser.parse_args(argv)
+    unknown = set(args.workloads) - set(WORKLOADS)
+    if unknown:
+        parser.error('unknown workloads: {}'.format(', '.join(sorted(unknown))))
+
+    print('{:<14}{:<8}{:>10}{:>10}{:>12}{:>14}'.format('workload', 'mode', 'write', 'save', 'kb', 'named styles'))
+    for name in args.workloads or sorted(WORKLOADS):
+        doc = WORKLOADS[name](args.scale)
+        for mode, named_styles in MODES:
+            write, save, size, styles = measure(doc, named_styles, args.repeat)
+            print('{:<14}{:<8}{:>10.3f}{:>10.3f}{:>12.1f}{:>14}'.format(name, mode, write, save, size / 1024, styles))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -18,6 +18,8 @@ setup(
         'Programming Language :: Python :: 3.6',
         'Programming Language :: Python :: 3.7'
     ],
-    packages=find_packages(),
-    install_requires=['openpyxl', 'premailer', 'requests', 'lxml']
+    packages=find_packages(exclude=['benchmarks', 'benchmarks.*']),
+    # Styles are written to the style lists of the workbook directly, which are not public api
+    install_requires=['openpyxl>=3.1,<3.2', 'premailer', 'requests', 'lxml'],
+    extras_require={'numpy': ['numpy']}
 )
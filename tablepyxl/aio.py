@@ -0,0 +1,89 @@
+"""
+Conversions for asyncio applications. Parsing, writing and saving run in an executor so they
+never block the event loop, and the number of conversions running at once can be limited.
+"""
+import asyncio
+import functools
+import inspect
+import os
+import weakref
+
+from tablepyxl.tablepyxl import document_to_bytes, document_to_workbook
+
+DEFAULT_CONCURRENCY = 4
+CHUNK_SIZE = 64 * 1024
+
+
+def _write_file(filename, data):
+    with open(filename, 'wb') as f:
+        f.write(data)
+
+
+async def _write_chunks(writer, data, chunk_size):
+    # Works with writers whose write is a coroutine, like aiofiles, and with stream writers that
+    # buffer writes and have to be drained, like asyncio.StreamWriter
+    drain = getattr(writer, 'drain', None)
+    view = memoryview(data)
+    for start in range(0, len(view), chunk_size):
+        written = writer.write(view[start:start + chunk_size])
+        if inspect.isawaitable(written):
+            await written
+        if drain is not None:
+            await drain()
+
+
+class AsyncConverter(object):
+    """
+    Runs conversions in an executor, at most ``max_concurrency`` at a time. The default
+    executor of the loop is used when none is given. A process pool can be used for
+    document_to_xl, document_to_workbook needs a thread pool since a workbook can't be
+    sent between processes.
+    """
+
+    def __init__(self, executor=None, max_concurrency=DEFAULT_CONCURRENCY, chunk_size=CHUNK_SIZE):
+        self.executor = executor
+        self.max_concurrency = max_concurrency
+        self.chunk_size = chunk_size
+        # A semaphore belongs to the loop it is first used on
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    def _semaphore(self, loop):
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        return semaphore
+
+    async def _run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        async with self._semaphore(loop):
+            return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+
+    async def document_to_workbook(self, doc, **kwargs):
+        return await self._run(document_to_workbook, doc, **kwargs)
+
+    async def document_to_bytes(self, doc, **kwargs):
+        return await self._run(document_to_bytes, doc, **kwargs)
+
+    async def document_to_xl(self, doc, output, **kwargs):
+        """
+        Write the xlsx file to a path, or in chunks to an async writer: an object whose
+        ``write`` is a coroutine, or which has a ``drain`` coroutine like asyncio.StreamWriter.
+        The keyword arguments are the options of document_to_xl.
+        """
+        data = await self.document_to_bytes(doc, **kwargs)
+        if isinstance(output, (str, os.PathLike)):
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, _write_file, output, data)
+        else:
+            await _write_chunks(output, data, self.chunk_size)
+
+
+default_converter = AsyncConverter()
+
+
+async def document_to_workbook_async(doc, converter=None, **kwargs):
+    return await (converter or default_converter).document_to_workbook(doc, **kwargs)
+
+
+async def document_to_xl_async(doc, output, converter=None, **kwargs):
+    return await (converter or default_converter).document_to_xl(doc, output, **kwargs)
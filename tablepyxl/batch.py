@@ -0,0 +1,82 @@
+import os
+import traceback
+from collections import deque, namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+
+from tablepyxl.exceptions import IntNotFoundException
+from tablepyxl.tablepyxl import document_to_xl
+
+BatchResult = namedtuple('BatchResult', ['index', 'filename', 'error'])
+
+_worker_options = {}
+
+
+def _init_worker(options):
+    # Options are sent once per worker instead of with every chunk. Compiled stylesheets and
+    # resolved styles are cached per process, so they stay warm across the chunks a worker runs.
+    _worker_options.clear()
+    _worker_options.update(options)
+
+
+def _convert(index, doc, filename, options):
+    try:
+        document_to_xl(doc, filename, **options)
+    except (Exception, IntNotFoundException):
+        return BatchResult(index, filename, traceback.format_exc())
+    return BatchResult(index, filename, None)
+
+
+def _convert_chunk(chunk):
+    return [_convert(index, doc, filename, _worker_options) for index, doc, filename in chunk]
+
+
+def _chunks(items, chunksize):
+    items = iter(enumerate(items))
+    while True:
+        chunk = [(index, doc, filename) for index, (doc, filename) in islice(items, chunksize)]
+        if not chunk:
+            return
+        yield chunk
+
+
+def documents_to_xl(items, workers=None, chunksize=1, ordered=True, **options):
+    """
+    Convert ``(doc, filename)`` pairs in a pool of worker processes, yielding a BatchResult
+    for each. A failing document does not stop the batch, its result carries the formatted
+    traceback as ``error``. Results come in the order of the items unless ``ordered`` is
+    False, in which case they come as soon as their chunk is done. With ``workers=0`` the
+    documents are converted in the calling process. Items are read as the results are taken,
+    at most two chunks per worker ahead of them.
+
+    Other keyword arguments are the options of document_to_xl, given to every conversion. They
+    are sent to the workers, so they have to be picklable.
+    """
+
+    if workers == 0:
+        for chunk in _chunks(items, chunksize):
+            for index, doc, filename in chunk:
+                yield _convert(index, doc, filename, options)
+        return
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    chunks = _chunks(items, chunksize)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(options,)) as executor:
+        # At most two chunks per worker are in flight: the items are read as the results are taken,
+        # and a batch closed early only waits for the chunks already submitted
+        pending = deque(executor.submit(_convert_chunk, chunk) for chunk in islice(chunks, workers * 2))
+        try:
+            while pending:
+                if ordered:
+                    done = [pending.popleft()]
+                else:
+                    done, not_done = wait(pending, return_when=FIRST_COMPLETED)
+                    pending = deque(not_done)
+                for future in done:
+                    results = future.result()
+                    pending.extend(executor.submit(_convert_chunk, chunk) for chunk in islice(chunks, 1))
+                    yield from results
+        finally:
+            for future in pending:
+                future.cancel()
@@ -0,0 +1,279 @@
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+
+COMMENT_RE = re.compile(r'/\*.*?\*/', re.S)
+IMPORTANT_RE = re.compile(r'\s*!\s*important\s*$', re.I)
+COMBINATOR_RE = re.compile(r'\s*(>)\s*|\s+')
+COMPOUND_RE = re.compile(r'''
+    (?P<tag>[a-zA-Z][\w-]*)?
+    (?P<rest>(?:\#[\w-]+|\.[\w-]+|\[[^\]]+\]|:first-child)*)$
+''', re.X)
+QUALIFIER_RE = re.compile(r'\#([\w-]+)|\.([\w-]+)|\[\s*([\w-]+)\s*(?:=\s*["\']?([^"\'\]]*)["\']?\s*)?\]|(:first-child)')
+
+EXTERNAL_STYLESHEET_RE = re.compile(r'<link\b[^>]*\brel\s*=\s*["\']?stylesheet', re.I)
+
+COMPILED_STYLESHEETS_SIZE = 64
+DECLARATIONS_CACHE_SIZE = 4096
+
+
+def split_rules(css):
+    """
+    Yield ``(selector_text, declarations_text)`` pairs for the plain style rules of a
+    stylesheet. At-rules, and the blocks they open, are skipped.
+    """
+    css = COMMENT_RE.sub('', css)
+    position, length = 0, len(css)
+    while position < length:
+        brace = css.find('{', position)
+        if brace == -1:
+            return
+        prelude = css[position:brace].strip()
+        if prelude.startswith('@') and ';' in prelude:
+            # Statement at-rules like @import or @charset end at a semicolon
+            position = css.find(';', position) + 1
+            continue
+
+        depth, end = 1, brace + 1
+        while depth and end < length:
+            if css[end] == '{':
+                depth += 1
+            elif css[end] == '}':
+                depth -= 1
+            end += 1
+        if not prelude.startswith('@'):
+            yield prelude, css[brace + 1:end - 1]
+        position = end
+
+
+def parse_declarations(text):
+    """
+    Split a declaration block into normal and !important declarations.
+    """
+    normal, important = OrderedDict(), OrderedDict()
+    for declaration in text.split(';'):
+        if ':' not in declaration:
+            continue
+        name, value = declaration.split(':', 1)
+        name = name.strip().lower()
+        value = value.strip()
+        if IMPORTANT_RE.search(value):
+            important[name] = IMPORTANT_RE.sub('', value)
+        else:
+            normal[name] = value
+    return normal, important
+
+
+class Compound(object):
+    __slots__ = ('tag', 'ids', 'classes', 'attributes', 'first_child')
+
+    def __init__(self, tag, ids, classes, attributes, first_child):
+        self.tag = tag
+        self.ids = ids
+        self.classes = classes
+        self.attributes = attributes
+        self.first_child = first_child
+
+    @classmethod
+    def parse(cls, text):
+        match = COMPOUND_RE.match(text)
+        if not match or not text:
+            return None
+        ids, classes, attributes, first_child = [], [], [], False
+        for id_, class_, attribute, value, pseudo in QUALIFIER_RE.findall(match.group('rest')):
+            if id_:
+                ids.append(id_)
+            elif class_:
+                classes.append(class_)
+            elif attribute:
+                attributes.append((attribute.lower(), value or None))
+            elif pseudo:
+                first_child = True
+        tag = match.group('tag')
+        return cls(tag.lower() if tag else None, ids, classes, attributes, first_child)
+
+    def matches(self, element):
+        if self.tag is not None and element.tag != self.tag:
+            return False
+        if self.ids and element.get('id') not in self.ids:
+            return False
+        if self.classes:
+            classes = element.get('class', '').split()
+            if not all(c in classes for c in self.classes):
+                return False
+        for attribute, value in self.attributes:
+            actual = element.get(attribute)
+            if actual is None or (value is not None and actual != value):
+                return False
+        if self.first_child and element.getprevious() is not None:
+            return False
+        return True
+
+
+class Selector(object):
+    """
+    A selector made of compound selectors joined by descendant or child combinators.
+    """
+    __slots__ = ('parts', 'specificity')
+
+    def __init__(self, parts):
+        # Right to left, each compound with the combinator joining it to the compound on its right
+        self.parts = parts
+        ids = sum(len(c.ids) for c, _ in parts)
+        classes = sum(len(c.classes) + len(c.attributes) + c.first_child for c, _ in parts)
+        tags = sum(c.tag is not None for c, _ in parts)
+        self.specificity = (ids, classes, tags)
+
+    @classmethod
+    def parse(cls, text):
+        # Premailer semantics: pseudo classes other than :first-child and * are not inlined
+        if '*' in text or ':' in text.replace(':first-child', ''):
+            return None
+        tokens = COMBINATOR_RE.split(text.strip())
+        compounds, combinators = [], []
+        # Splitting on a group interleaves compound, combinator, compound...
+        for index, token in enumerate(tokens):
+            if index % 2:
+                combinators.append(token or ' ')
+                continue
+            compound = Compound.parse(token)
+            if compound is None:
+                return None
+            compounds.append(compound)
+        return cls(list(zip(reversed(compounds), [None] + list(reversed(combinators)))))
+
+    @property
+    def key(self):
+        compound = self.parts[0][0]
+        if compound.ids:
+            return 'id', compound.ids[0]
+        if compound.classes:
+            return 'class', compound.classes[0]
+        if compound.tag:
+            return 'tag', compound.tag
+        return 'any', None
+
+    @property
+    def contextual(self):
+        return len(self.parts) > 1 or any(c.attributes or c.first_child for c, _ in self.parts)
+
+    def matches(self, element, index=0):
+        compound, _ = self.parts[index]
+        if not compound.matches(element):
+            return False
+        if index + 1 == len(self.parts):
+            return True
+
+        combinator = self.parts[index + 1][1]
+        ancestor = element.getparent()
+        while ancestor is not None:
+            if self.matches(ancestor, index + 1):
+                return True
+            if combinator == '>':
+                return False
+            ancestor = ancestor.getparent()
+        return False
+
+
+class Stylesheet(object):
+    """
+    Style rules of a document indexed by the id, class or tag of their rightmost compound
+    selector, so only the rules that can apply to an element are tested against it.
+    """
+
+    def __init__(self, css):
+        self._index = {}
+        self._contextual = False
+        # Kept as long as the compiled stylesheet is, only the first elements of each kind are cached
+        self._cache = {}
+        self._cache_lock = threading.Lock()
+
+        order = 0
+        for selector_text, declarations_text in split_rules(css):
+            normal, important = parse_declarations(declarations_text)
+            for text in selector_text.split(','):
+                selector = Selector.parse(text)
+                if selector is None:
+                    continue
+                self._contextual = self._contextual or selector.contextual
+                for is_important, declarations in ((1, important), (0, normal)):
+                    if declarations:
+                        priority = (is_important,) + selector.specificity + (order,)
+                        self._index.setdefault(selector.key, []).append((priority, selector, declarations))
+                        order += 1
+        # Ids are mostly unique, they are only part of the cache key when a rule selects by one
+        self._has_ids = any(kind == 'id' for kind, _ in self._index)
+
+    def __bool__(self):
+        return bool(self._index)
+
+    def _candidates(self, element):
+        index = self._index
+        candidates = list(index.get(('any', None), ()))
+        candidates.extend(index.get(('tag', element.tag), ()))
+        element_id = element.get('id')
+        if element_id:
+            candidates.extend(index.get(('id', element_id), ()))
+        for class_ in set(element.get('class', '').split()):
+            candidates.extend(index.get(('class', class_), ()))
+        return candidates
+
+    def declarations(self, element):
+        """
+        The declarations of every rule matching the element, merged in cascade order.
+        """
+        key = None
+        if not self._contextual:
+            key = element.tag, element.get('id') if self._has_ids else None, element.get('class')
+            cached = self._cache.get(key)
+            if cached is not None:
+                return cached
+
+        matched = sorted((rule for rule in self._candidates(element) if rule[1].matches(element)),
+                         key=lambda rule: rule[0])
+        result = {}
+        for _, _, declarations in matched:
+            result.update(declarations)
+
+        if key is not None and len(self._cache) < DECLARATIONS_CACHE_SIZE:
+            with self._cache_lock:
+                self._cache[key] = result
+        return result
+
+
+_compiled_stylesheets = OrderedDict()
+_compiled_stylesheets_lock = threading.Lock()
+
+
+def compile_stylesheet(css):
+    """
+    Compile the css once and reuse it for every document sharing the same stylesheet.
+    """
+    key = hashlib.sha1(css.encode('utf-8')).hexdigest()
+    with _compiled_stylesheets_lock:
+        stylesheet = _compiled_stylesheets.get(key)
+        if stylesheet is not None:
+            _compiled_stylesheets.move_to_end(key)
+            return stylesheet
+
+    stylesheet = Stylesheet(css)
+    with _compiled_stylesheets_lock:
+        _compiled_stylesheets[key] = stylesheet
+        while len(_compiled_stylesheets) > COMPILED_STYLESHEETS_SIZE:
+            _compiled_stylesheets.popitem(last=False)
+    return stylesheet
+
+
+def document_stylesheet(tree):
+    """
+    The compiled ``<style>`` blocks of a parsed document, or None when it has none.
+    """
+    css = '\n'.join(style.text or '' for style in tree.iter('style'))
+    if not css.strip():
+        return None
+    return compile_stylesheet(css)
+
+
+def has_external_stylesheet(doc):
+    return EXTERNAL_STYLESHEET_RE.search(doc) is not None
@@ -0,0 +1,411 @@
+"""
+An xlsx writer that serializes laid out tables straight into the parts of the file, without
+building openpyxl cells. Each sheet is streamed into the archive row by row, strings go to a
+shared strings table and every distinct style becomes one cell format. Only the styles
+themselves, a few hundred objects at most, are serialized by openpyxl.
+
+Selected with ``engine='fast'`` in document_to_xl and document_to_bytes.
+"""
+from datetime import datetime, timezone
+from xml.sax.saxutils import escape, quoteattr
+from zipfile import ZIP_DEFLATED, ZIP_STORED, ZipFile
+
+from openpyxl.cell.cell import ERROR_CODES, ILLEGAL_CHARACTERS_RE, NUMERIC_TYPES, TIME_TYPES
+from openpyxl.cell.rich_text import CellRichText
+from openpyxl.compat import safe_string
+from openpyxl.packaging.core import DocumentProperties
+from openpyxl.packaging.extended import ExtendedProperties
+from openpyxl.styles.borders import DEFAULT_BORDER
+from openpyxl.styles.cell_style import CellStyle, CellStyleList
+from openpyxl.styles.fills import DEFAULT_EMPTY_FILL, DEFAULT_GRAY_FILL
+from openpyxl.styles.fonts import DEFAULT_FONT
+from openpyxl.styles.named_styles import _NamedCellStyle, _NamedCellStyleList
+from openpyxl.styles.numbers import BUILTIN_FORMATS_MAX_SIZE, BUILTIN_FORMATS_REVERSE, NumberFormat
+from openpyxl.styles.stylesheet import Stylesheet
+from openpyxl.utils import get_column_letter
+from openpyxl.utils.datetime import to_excel
+from openpyxl.utils.exceptions import IllegalCharacterError
+from openpyxl.utils.indexed_list import IndexedList
+from openpyxl.writer.theme import theme_xml
+from openpyxl.xml.functions import tostring
+
+from tablepyxl.layout import SpanGrid, frame_edges, measure_tables
+from tablepyxl.style import StyleRegistry, table_frame
+
+ENGINES = ('openpyxl', 'fast')
+MAX_STRING_LENGTH = 32767
+# Rows are collected into chunks of about this many characters before they are written
+CHUNK_SIZE = 256 * 1024
+
+SHEET_MAIN_NS = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+REL_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+PKG_REL_NS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+CONTENT_TYPES_NS = 'http://schemas.openxmlformats.org/package/2006/content-types'
+SPREADSHEET_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.{}+xml'
+
+SHEET_HEAD = (
+    '<worksheet xmlns="{ns}"><sheetPr><outlinePr summaryBelow="1" summaryRight="1"/><pageSetUpPr/></sheetPr>'
+    '<dimension ref="{dimension}"/><sheetViews><sheetView workbookViewId="0"><selection activeCell="A1" '
+    'sqref="A1"/></sheetView></sheetViews><sheetFormatPr baseColWidth="8" defaultRowHeight="15"/>'
+)
+SHEET_TAIL = '<pageMargins left="0.75" right="0.75" top="1" bottom="1" header="0.5" footer="0.5"/></worksheet>'
+
+
+def _text(value):
+    if value != value.strip():
+        return '<t xml:space="preserve">{}</t>'.format(escape(value))
+    return '<t>{}</t>'.format(escape(value))
+
+
+class StyleTable(object):
+    """
+    The cell formats of a workbook, numbered in the order they are first used. Formats are built
+    from the fonts, fills, borders and alignments of the style registry, a format is added once
+    per distinct style, number format and table frame.
+    """
+
+    def __init__(self, registry=None):
+        self.registry = registry if registry is not None else StyleRegistry()
+        self.fonts = IndexedList([DEFAULT_FONT])
+        self.fills = IndexedList([DEFAULT_EMPTY_FILL, DEFAULT_GRAY_FILL])
+        self.borders = IndexedList([DEFAULT_BORDER])
+        self.number_formats = IndexedList()
+        self.formats = [CellStyle()]
+        self._ids = {(0, 0, 0, 0, None): 0}
+        self._styles = {}
+
+    def _number_format_id(self, number_format):
+        if number_format is None:
+            return 0
+        builtin = BUILTIN_FORMATS_REVERSE.get(number_format)
+        if builtin is not None:
+            return builtin
+        return self.number_formats.add(number_format) + BUILTIN_FORMATS_MAX_SIZE
+
+    def _add(self, font, fill, border, alignment, number_format):
+        # Formats are told apart by what they are built from, styles that end up drawn the same,
+        # e.g. a cell whose own border is the frame of its table, share one
+        ids = (self._number_format_id(number_format), self.fonts.add(font), self.fills.add(fill),
+               self.borders.add(border), alignment)
+        format_id = self._ids.get(ids)
+        if format_id is None:
+            number_format_id, font_id, fill_id, border_id, _ = ids
+            cell_format = CellStyle(numFmtId=number_format_id, fontId=font_id, fillId=fill_id, borderId=border_id)
+            cell_format.alignment = alignment
+            format_id = self._ids[ids] = len(self.formats)
+            self.formats.append(cell_format)
+        return format_id
+
+    def cell_format(self, table_cell):
+        # Cells built from the same markup share their resolved style, looking it up is cheaper than its key
+        lookup = (table_cell.style_dict, table_cell.number_format)
+        format_id = self._styles.get(lookup)
+        if format_id is None:
+            style = self.registry.named_style(table_cell.style_dict, number_format=table_cell.number_format)
+            format_id = self._styles[lookup] = self._add(style.font, style.fill, style.border, style.alignment,
+                                                         table_cell.number_format)
+        return format_id
+
+    def framed_format(self, table_cell, edges):
+        frame_key = tuple(sorted(edges.items()))
+        if table_cell is None:
+            # A cell of the frame that no table cell reaches only has the border
+            lookup = (None, None, frame_key)
+        else:
+            lookup = (table_cell.style_dict, table_cell.number_format, frame_key)
+        format_id = self._styles.get(lookup)
+        if format_id is None:
+            style_dict, number_format, _ = lookup
+            border = self.registry.framed_border(style_dict, edges)
+            if table_cell is None:
+                format_id = self._add(DEFAULT_FONT, DEFAULT_EMPTY_FILL, border, None, None)
+            else:
+                style = self.registry.named_style(style_dict, number_format=number_format)
+                format_id = self._add(style.font, style.fill, border, style.alignment, number_format)
+            self._styles[lookup] = format_id
+        return format_id
+
+    def to_xml(self):
+        stylesheet = Stylesheet()
+        stylesheet.fonts = list(self.fonts)
+        stylesheet.fills = list(self.fills)
+        stylesheet.borders = list(self.borders)
+        stylesheet.numFmts.numFmt = [NumberFormat(index, code) for index, code in
+                                     enumerate(self.number_formats, BUILTIN_FORMATS_MAX_SIZE)]
+        stylesheet.cellStyleXfs = CellStyleList(xf=[CellStyle()])
+        stylesheet.cellXfs = CellStyleList(xf=self.formats)
+        stylesheet.cellStyles = _NamedCellStyleList(cellStyle=[_NamedCellStyle(name='Normal', xfId=0, builtinId=0)])
+        return tostring(stylesheet.to_tree())
+
+
+class SharedStrings(object):
+    # Rich text objects whose index is known, by identity. Interned values are shared by the
+    # cells holding them, each is only serialized once.
+    RICH_TEXT_CACHE_SIZE = 4096
+
+    def __init__(self):
+        self._index = {}
+        self._rich_text = {}
+        self.items = []
+        self.references = 0
+
+    def add(self, value):
+        """
+        The index of a string or rich text, added the first time it is seen.
+        """
+        self.references += 1
+        if isinstance(value, CellRichText):
+            # The value is kept with its index so that its id isn't reused while cached
+            known = self._rich_text.get(id(value))
+            if known is not None:
+                return known[1]
+            index = self._add_rich_text(value)
+            if len(self._rich_text) >= self.RICH_TEXT_CACHE_SIZE:
+                self._rich_text.clear()
+            self._rich_text[id(value)] = (value, index)
+            return index
+        index = self._index.get(value)
+        if index is None:
+            index = self._index[value] = len(self.items)
+            self.items.append('<si>{}</si>'.format(_text(value)))
+        return index
+
+    def _add_rich_text(self, value):
+        item = value.to_tree()
+        item.tag = 'si'
+        xml = tostring(item).decode('utf-8')
+        # Kept apart from the plain strings, which could have the same characters
+        key = (xml,)
+        index = self._index.get(key)
+        if index is None:
+            index = self._index[key] = len(self.items)
+            self.items.append(xml)
+        return index
+
+    def to_xml(self):
+        return '<sst xmlns="{}" count="{}" uniqueCount="{}">{}</sst>'.format(
+            SHEET_MAIN_NS, self.references, len(self.items), ''.join(self.items)).encode('utf-8')
+
+
+def cell_xml(reference, format_id, value, data_type, strings):
+    """
+    The <c> element of a cell, typed the way openpyxl types a value assigned to a cell. A data
+    type forced by the cell's classes replaces the type of the value.
+    """
+    if isinstance(value, str):
+        value = value[:MAX_STRING_LENGTH]
+        if ILLEGAL_CHARACTERS_RE.search(value):
+            raise IllegalCharacterError('{} cannot be used in worksheets.'.format(value))
+        value_type = 's'
+        if len(value) > 1 and value.startswith('='):
+            value_type = 'f'
+        elif value in ERROR_CODES:
+            value_type = 'e'
+    elif isinstance(value, CellRichText):
+        value_type = 's'
+    elif isinstance(value, bool):
+        value_type = 'b'
+    elif isinstance(value, NUMERIC_TYPES) or value is None:
+        value_type = 'n'
+    elif isinstance(value, TIME_TYPES):
+        value_type = 'd'
+    else:
+        raise ValueError('Cannot convert {!r} to Excel'.format(value))
+    data_type = data_type or value_type
+
+    if value is None or value == '':
+        # Without a value there is nothing to type, an inline string would need its <is> element
+        return '<c r="{}" s="{}"/>'.format(reference, format_id)
+    if data_type == 's':
+        if not isinstance(value, (str, CellRichText)):
+            value = str(value)
+        return '<c r="{}" s="{}" t="s"><v>{}</v></c>'.format(reference, format_id, strings.add(value))
+    if data_type == 'f':
+        return '<c r="{}" s="{}"><f>{}</f><v/></c>'.format(reference, format_id, escape(str(value)[1:]))
+    if data_type == 'd':
+        if getattr(value, 'tzinfo', None) is not None:
+            raise TypeError('Excel does not support timezones in datetimes. '
+                            'The tzinfo in the datetime/time object must be set to None.')
+        data_type, value = 'n', to_excel(value)
+    return '<c r="{}" s="{}" t="{}"><v>{}</v></c>'.format(reference, format_id, data_type,
+                                                          escape(safe_string(value)))
+
+
+class FastWorkbookWriter(object):
+    """
+    Writes sheets of tables to an xlsx file at a path or in a binary file-like object. Sheets are
+    written as they are added, the rest of the file when the writer is closed.
+    """
+
+    def __init__(self, output, compresslevel=None, registry=None, stats=None):
+        compression = ZIP_STORED if compresslevel == 0 else ZIP_DEFLATED
+        self.archive = ZipFile(output, 'w', compression, allowZip64=True, compresslevel=compresslevel or None)
+        self.styles = StyleTable(registry)
+        self.strings = SharedStrings()
+        self.stats = stats
+        self.titles = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.archive.close()
+
+    def add_sheet(self, tables, layouts=None, title=None):
+        """
+        Write tables one below the other on a new sheet. The layouts are measured from the tables
+        when they are not given, tables can be an iterator when they are.
+        """
+        if layouts is None:
+            tables = list(tables)
+            layouts = measure_tables(tables)
+
+        if title is None:
+            title = 'Sheet' if not self.titles else 'Sheet{}'.format(len(self.titles))
+        self.titles.append(title)
+
+        last_row = max([layout.last_row for layout in layouts] or [1])
+        last_column = max([layout.last_column for layout in layouts] or [1])
+        column_widths = {}
+        for layout in layouts:
+            for column, width in layout.column_widths.items():
+                column_widths[column] = max(column_widths.get(column, 0), width)
+
+        merges = []
+        path = 'xl/worksheets/sheet{}.xml'.format(len(self.titles))
+        with self.archive.open(path, 'w', force_zip64=True) as part:
+            part.write(SHEET_HEAD.format(ns=SHEET_MAIN_NS, dimension='A1:{}{}'.format(
+                get_column_letter(max(last_column, 1)), max(last_row, 1))).encode('utf-8'))
+            if column_widths:
+                part.write('<cols>{}</cols>'.format(''.join(
+                    '<col min="{0}" max="{0}" width="{1}" customWidth="1"/>'.format(column, width)
+                    for column, width in sorted(column_widths.items()))).encode('utf-8'))
+
+            part.write(b'<sheetData>')
+            chunk, size = [], 0
+            for table, layout in zip(tables, layouts):
+                for row_xml in self._table_rows(table, layout, merges):
+                    chunk.append(row_xml)
+                    size += len(row_xml)
+                    if size >= CHUNK_SIZE:
+                        part.write(''.join(chunk).encode('utf-8'))
+                        chunk, size = [], 0
+                if self.stats is not None:
+                    self.stats.tables += 1
+            part.write(''.join(chunk).encode('utf-8'))
+            part.write(b'</sheetData>')
+
+            if merges:
+                part.write('<mergeCells count="{}">{}</mergeCells>'.format(
+                    len(merges), ''.join('<mergeCell ref="{}"/>'.format(ref) for ref in merges)).encode('utf-8'))
+            part.write(SHEET_TAIL.encode('utf-8'))
+
+    def _table_rows(self, table, layout, merges):
+        styles, strings, stats = self.styles, self.strings, self.stats
+        frame = table_frame(table.style_dict)
+        letters = {}
+
+        grid = SpanGrid(layout.first_row, layout.first_column)
+        for row, slots in grid.place_rows(table.body.rows):
+            owners = {column: (table_cell, anchor) for column, table_cell, anchor in slots}
+            edged = {}
+            if frame:
+                if row in (layout.first_row, layout.last_row):
+                    columns = range(layout.first_column, layout.last_column + 1)
+                else:
+                    columns = (layout.first_column, layout.last_column)
+                for column in columns:
+                    edges = frame_edges(layout, row, column, frame)
+                    if edges:
+                        edged[column] = edges
+                        owners.setdefault(column, (None, False))
+
+            cells = []
+            for column in sorted(owners):
+                table_cell, anchor = owners[column]
+                letter = letters.get(column)
+                if letter is None:
+                    letter = letters[column] = get_column_letter(column)
+                reference = '{}{}'.format(letter, row)
+
+                edges = edged.get(column)
+                if edges:
+                    format_id = styles.framed_format(table_cell, edges)
+                else:
+                    format_id = styles.cell_format(table_cell)
+                if table_cell is None:
+                    cells.append('<c r="{}" s="{}"/>'.format(reference, format_id))
+                    continue
+
+                value = None
+                if anchor:
+                    value = table_cell.value
+                    rowspan, colspan = table_cell.rowspan, table_cell.colspan
+                    if rowspan > 1 or colspan > 1:
+                        merges.append('{}:{}{}'.format(reference, get_column_letter(column + colspan - 1),
+                                                       row + rowspan - 1))
+                cells.append(cell_xml(reference, format_id, value, table_cell.data_type(), strings))
+
+            if stats is not None:
+                stats.count_row(slots)
+            height = layout.row_heights.get(row)
+            if height:
+                yield '<row r="{}" ht="{}" customHeight="1">{}</row>'.format(row, height, ''.join(cells))
+            else:
+                yield '<row r="{}">{}</row>'.format(row, ''.join(cells))
+
+    def close(self):
+        if not self.titles:
+            self.add_sheet([])
+        archive = self.archive
+        sheets = range(1, len(self.titles) + 1)
+
+        archive.writestr('xl/sharedStrings.xml', self.strings.to_xml())
+        archive.writestr('xl/styles.xml', self.styles.to_xml())
+        archive.writestr('xl/theme/theme1.xml', theme_xml)
+
+        archive.writestr('xl/workbook.xml', (
+            '<workbook xmlns="{}" xmlns:r="{}"><workbookPr/><bookViews><workbookView activeTab="0"/></bookViews>'
+            '<sheets>{}</sheets><calcPr calcId="124519" fullCalcOnLoad="1"/></workbook>'
+        ).format(SHEET_MAIN_NS, REL_NS, ''.join(
+            '<sheet name={} sheetId="{}" r:id="rId{}"/>'.format(quoteattr(title), index, index)
+            for index, title in zip(sheets, self.titles))))
+
+        relationships = ['<Relationship Id="rId{0}" Type="{1}/worksheet" Target="worksheets/sheet{0}.xml"/>'.format(
+            index, REL_NS) for index in sheets]
+        for index, (kind, target) in enumerate((('styles', 'styles.xml'), ('theme', 'theme/theme1.xml'),
+                                                ('sharedStrings', 'sharedStrings.xml')), len(self.titles) + 1):
+            relationships.append('<Relationship Id="rId{}" Type="{}/{}" Target="{}"/>'.format(
+                index, REL_NS, kind, target))
+        archive.writestr('xl/_rels/workbook.xml.rels', '<Relationships xmlns="{}">{}</Relationships>'.format(
+            PKG_REL_NS, ''.join(relationships)))
+
+        properties = DocumentProperties()
+        properties.modified = datetime.now(tz=timezone.utc).replace(tzinfo=None)
+        archive.writestr('docProps/core.xml', tostring(properties.to_tree()))
+        archive.writestr('docProps/app.xml', tostring(ExtendedProperties().to_tree()))
+        archive.writestr('_rels/.rels', (
+            '<Relationships xmlns="{0}">'
+            '<Relationship Id="rId1" Type="{1}/officeDocument" Target="xl/workbook.xml"/>'
+            '<Relationship Id="rId2" Type="{0}/metadata/core-properties" Target="docProps/core.xml"/>'
+            '<Relationship Id="rId3" Type="{1}/extended-properties" Target="docProps/app.xml"/>'
+            '</Relationships>'
+        ).format(PKG_REL_NS, REL_NS))
+
+        overrides = [('/xl/workbook.xml', SPREADSHEET_TYPE.format('sheet.main')),
+                     ('/xl/styles.xml', SPREADSHEET_TYPE.format('styles')),
+                     ('/xl/sharedStrings.xml', SPREADSHEET_TYPE.format('sharedStrings')),
+                     ('/xl/theme/theme1.xml', 'application/vnd.openxmlformats-officedocument.theme+xml'),
+                     ('/docProps/core.xml', 'application/vnd.openxmlformats-package.core-properties+xml'),
+                     ('/docProps/app.xml', 'application/vnd.openxmlformats-officedocument.extended-properties+xml')]
+        overrides.extend(('/xl/worksheets/sheet{}.xml'.format(index), SPREADSHEET_TYPE.format('worksheet'))
+                         for index in sheets)
+        archive.writestr('[Content_Types].xml', (
+            '<Types xmlns="{}"><Default Extension="rels" ContentType="application/vnd.openxmlformats-package.'
+            'relationships+xml"/><Default Extension="xml" ContentType="application/xml"/>{}</Types>'
+        ).format(CONTENT_TYPES_NS, ''.join('<Override PartName="{}" ContentType="{}"/>'.format(name, content_type)
+                                           for name, content_type in overrides)))
+        archive.close()
@@ -0,0 +1,121 @@
+from io import BytesIO
+
+from lxml import etree
+
+from tablepyxl.css import compile_stylesheet
+from tablepyxl.style import Element, Table, TableBody, TableHead, TableRow
+
+
+def release(element):
+    """
+    Free a fully processed element and the siblings parsed before it.
+    """
+    element.clear()
+    parent = element.getparent()
+    if parent is not None:
+        while element.getprevious() is not None:
+            del parent[0]
+
+
+class TableEvents(object):
+    """
+    A single cursor over the parse events of a document. Tables and their rows pull from it
+    in document order, so a table has to be consumed before the next one is requested.
+    """
+
+    def __init__(self, doc, values=None):
+        if isinstance(doc, str):
+            doc = doc.encode('utf-8')
+        self._events = etree.iterparse(BytesIO(doc), events=('start', 'end'), html=True,
+                                       remove_comments=True, encoding='utf-8')
+        self._pushed = []
+        self._css = []
+        self.stylesheet = None
+        self.values = values
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._pushed:
+            return self._pushed.pop()
+        event, element = next(self._events)
+        if event == 'end' and element.tag == 'style' and element.text:
+            # Rules apply to the tables that follow the <style> block, usually all of them
+            self._css.append(element.text)
+            self.stylesheet = compile_stylesheet('\n'.join(self._css))
+        return event, element
+
+    def push(self, event, element):
+        self._pushed.append((event, element))
+
+
+class IncrementalTableBody(TableBody):
+    def __init__(self, body, table, events, parent=None):
+        self.stylesheet = parent.stylesheet
+        self.values = parent.values
+        Element.__init__(self, body, parent=parent)
+        self.cell_padding = self.get_dimension('padding') or 0
+        self.body_element = body
+        self.table_element = table
+        self.rows = self._iter_rows(events)
+
+    def _owns(self, tr):
+        return tr.getparent() is self.body_element
+
+    def _iter_rows(self, events):
+        for event, element in events:
+            if event != 'end':
+                continue
+            if element is self.table_element:
+                return
+            if element.tag == 'tr' and self._owns(element):
+                yield TableRow(element, parent=self)
+                release(element)
+
+
+class IncrementalTable(Table):
+    """
+    A table whose attributes and head are parsed up front while the body rows are parsed
+    lazily, as they are iterated.
+    """
+
+    def __init__(self, table, events):
+        self.stylesheet = events.stylesheet
+        self.values = events.values
+        Element.__init__(self, table, stylesheet=events.stylesheet)
+        self.table_element = table
+        self.head = None
+        self.body = None
+
+        for event, element in events:
+            parent = element.getparent()
+            if event == 'start' and element.tag == 'tbody' and parent is table:
+                self.body = IncrementalTableBody(element, table, events, parent=self)
+                break
+            if event == 'end':
+                if element.tag == 'thead' and parent is table and self.head is None:
+                    self.head = TableHead(element, parent=self)
+                elif (element.tag == 'tr' and parent is table) or element is table:
+                    events.push(event, element)
+                    self.body = IncrementalTableBody(table, table, events, parent=self)
+                    break
+
+    def drain(self):
+        for _ in self.body.rows:
+            pass
+        release(self.table_element)
+
+
+def iter_tables(doc, values=None):
+    """
+    Yield the top level tables of an html document as they are parsed, see get_tables for values.
+    """
+    events = TableEvents(doc, values)
+    for event, element in events:
+        if event == 'start' and element.tag == 'table':
+            table = IncrementalTable(element, events)
+            yield table
+            table.drain()
+        elif event == 'end':
+            release(element)
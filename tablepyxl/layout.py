@@ -0,0 +1,285 @@
+import copy
+import functools
+from array import array
+from datetime import date
+
+from openpyxl.utils import get_column_letter
+
+# The size of an Excel worksheet
+MAX_ROWS = 1048576
+MAX_COLUMNS = 16384
+DEFAULT_COLUMN_WIDTH = 13
+DEFAULT_ROW_HEIGHT = 15
+DEFAULT_FONT_SIZE = 11
+BOLD_WIDTH_FACTOR = 1.1
+# Below this many measurements the plain python reduction is faster than converting to arrays
+VECTORIZE_THRESHOLD = 50000
+
+
+def cell_size(value, style_dict=None):
+    if isinstance(value, date):
+        # Dates are displayed with the short mm/dd/yyyy format, not as their iso string
+        value = 'mm/dd/yyyy'
+    lines = [len(line) for line in str(value).split('\n')]
+    width, height = max(lines), len(lines) * DEFAULT_ROW_HEIGHT
+    if style_dict is not None:
+        _, size, bold, _, _ = style_dict.key[0]
+        scale = size / DEFAULT_FONT_SIZE if size else 1
+        if bold:
+            width = int(width * scale * BOLD_WIDTH_FACTOR + 0.5)
+        elif scale != 1:
+            width = int(width * scale + 0.5)
+        if scale != 1:
+            height = int(height * scale + 0.5)
+    return width + 2, height
+
+
+@functools.lru_cache(maxsize=None)
+def _numpy():
+    # Imported on first use, most sheets are too small to need it
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+class Autosizer(object):
+    """
+    Collects the text extent of cells as they are laid out and reduces it to column widths
+    and row heights once, after the whole sheet is known. Large sheets are reduced with
+    numpy when it is installed.
+    """
+
+    def __init__(self):
+        self._columns = array('l')
+        self._widths = array('l')
+        self._rows = array('l')
+        self._heights = array('l')
+
+    def add(self, table_cell, row, column):
+        width, height = cell_size(table_cell.value, table_cell.style_dict)
+        colspan = table_cell.colspan
+        width = width // colspan + 1
+        if width > DEFAULT_COLUMN_WIDTH:
+            for spanned in range(column, column + colspan):
+                self._columns.append(spanned)
+                self._widths.append(width)
+        if height > DEFAULT_ROW_HEIGHT:
+            self._rows.append(row)
+            self._heights.append(height)
+
+    @staticmethod
+    def _reduce(keys, values):
+        numpy = _numpy() if len(keys) >= VECTORIZE_THRESHOLD else None
+        if numpy is not None:
+            keys = numpy.frombuffer(keys, dtype=numpy.dtype(keys.typecode))
+            values = numpy.frombuffer(values, dtype=numpy.dtype(values.typecode))
+            maxima = numpy.zeros(keys.max() + 1, dtype=values.dtype)
+            numpy.maximum.at(maxima, keys, values)
+            present = numpy.flatnonzero(maxima)
+            return dict(zip(present.tolist(), maxima[present].tolist()))
+
+        maxima = {}
+        for key, value in zip(keys, values):
+            if value > maxima.get(key, 0):
+                maxima[key] = value
+        return maxima
+
+    def column_widths(self, columns=()):
+        """
+        Widths of the given columns and of every column holding text wider than the default.
+        """
+        widths = dict.fromkeys(columns, DEFAULT_COLUMN_WIDTH)
+        widths.update(self._reduce(self._columns, self._widths))
+        return widths
+
+    def row_heights(self):
+        """
+        Heights of the rows holding text taller than the default.
+        """
+        return self._reduce(self._rows, self._heights)
+
+    def apply(self, worksheet, columns=()):
+        for column, width in sorted(self.column_widths(columns).items()):
+            worksheet.column_dimensions[get_column_letter(column)].width = width
+        for row, height in sorted(self.row_heights().items()):
+            worksheet.row_dimensions[row].height = height
+
+
+class SpanGrid(object):
+    """
+    Assigns sheet coordinates to table cells one row at a time, following the html
+    table model: a cell goes to the first column of its row not covered by a span.
+    """
+
+    def __init__(self, row=1, column=1):
+        self.first_row = row
+        self.first_column = column
+        self.row = row
+        self.last_row = row - 1
+        self.last_column = column - 1
+        self._rowspans = {}
+
+    def place_row(self, cells):
+        """
+        Place the next row and return its ``(column, table_cell, is_anchor)`` slots ordered
+        by column. Slots covered by a span carry the table cell owning the span. A row going past
+        the last column of a sheet raises a ValueError.
+        """
+        row = self.row
+        slots = {}
+        for column, (last_row, owner) in self._rowspans.items():
+            if last_row >= row:
+                slots[column] = (column, owner, False)
+
+        column = self.first_column
+        for table_cell in cells:
+            while column in slots:
+                column += 1
+            rowspan, colspan = table_cell.rowspan, table_cell.colspan
+            slots[column] = (column, table_cell, True)
+            for covered in range(column + 1, column + colspan):
+                slots.setdefault(covered, (covered, table_cell, False))
+            if rowspan > 1:
+                for covered in range(column, column + colspan):
+                    self._rowspans[covered] = (row + rowspan - 1, table_cell)
+                self.last_row = max(self.last_row, row + rowspan - 1)
+            column += colspan
+
+        self._rowspans = {c: span for c, span in self._rowspans.items() if span[0] > row}
+        self.row += 1
+        self.last_row = max(self.last_row, row)
+        if slots:
+            self.last_column = max(self.last_column, max(slots))
+            if self.last_column > MAX_COLUMNS:
+                raise ValueError('A table is {} columns wide, a sheet has {}'.format(self.last_column, MAX_COLUMNS))
+        return [slots[column] for column in sorted(slots)]
+
+    def place_rows(self, rows):
+        """
+        Place the rows of a table and then the rows only reached by its rowspans, yielding
+        ``(row, slots)`` for each.
+        """
+        for table_row in rows:
+            row = self.row
+            yield row, self.place_row(table_row.cells)
+        while self.row <= self.last_row:
+            row = self.row
+            yield row, self.place_row(())
+
+
+def frame_edges(extent, row, column, frame):
+    """
+    The sides of a table frame drawn on a cell, empty for cells inside the table. The extent
+    is a finished SpanGrid or a TableLayout.
+    """
+    edges = {}
+    if row == extent.first_row and 'top' in frame:
+        edges['top'] = frame['top']
+    if row == extent.last_row and 'bottom' in frame:
+        edges['bottom'] = frame['bottom']
+    if column == extent.first_column and 'left' in frame:
+        edges['left'] = frame['left']
+    if column == extent.last_column and 'right' in frame:
+        edges['right'] = frame['right']
+    return edges
+
+
+class TableLayout(object):
+    """
+    Extent, column widths and row heights of a table, measured before anything is
+    written so that a write-only worksheet never needs to revisit a cell.
+    """
+
+    def __init__(self, table, row=1, column=1):
+        self.first_row = row
+        self.first_column = column
+
+        sizes = Autosizer()
+        grid = SpanGrid(row, column)
+        for row, slots in grid.place_rows(table.body.rows):
+            for column, table_cell, anchor in slots:
+                if anchor:
+                    sizes.add(table_cell, row, column)
+
+        self.last_row = grid.last_row
+        self.last_column = grid.last_column
+        self.column_widths = sizes.column_widths(range(self.first_column, self.last_column + 1))
+        self.row_heights = sizes.row_heights()
+
+
+def measure_tables(tables, row=1):
+    """
+    Lay out tables one below the other, separated by an empty row.
+    """
+    layouts = []
+    for table in tables:
+        layout = TableLayout(table, row)
+        layouts.append(layout)
+        row = layout.last_row + 2
+    return layouts
+
+
+def _table_part(table, rows):
+    part = copy.copy(table)
+    part.body = copy.copy(table.body)
+    part.body.rows = rows
+    return part
+
+
+def split_table(table, size, first=None, repeat_head=False):
+    """
+    Split the rows of a table into parts of at most ``size`` sheet rows, yielding each part as a
+    table of its own with the number of rows it takes. The first part is at most ``first`` rows,
+    or as long as the others when no part of the table fits in that many. A part only ends where
+    no rowspan continues into the next row, so merged ranges are never split. With repeat_head
+    the rows of the table head are written at the top of every part.
+    """
+    head = list(table.head.rows) if repeat_head and table.head is not None else []
+    head_size = sum(1 for _ in SpanGrid().place_rows(head))
+    if head_size >= size:
+        raise ValueError('The head of a table takes {} rows, parts of {} rows leave none for the body'.format(
+            head_size, size))
+
+    budget = (size if first is None else first) - head_size
+    grid = SpanGrid()
+    # Rows not yet in a part, the first of them is on row start of the grid. A part can end after
+    # the first breaks of them.
+    pending, start, breaks = [], 1, 0
+    for table_row in table.body.rows:
+        grid.place_row(table_row.cells)
+        pending.append(table_row)
+        if grid.last_row - start + 1 > budget:
+            if breaks:
+                yield _table_part(table, head + pending[:breaks]), head_size + breaks
+                pending, start, breaks = pending[breaks:], start + breaks, 0
+            budget = size - head_size
+            if grid.last_row - start + 1 > budget:
+                raise ValueError('A rowspan of a table covers more than the {} rows of a part'.format(budget))
+        if grid.last_row < grid.row:
+            breaks = len(pending)
+    yield _table_part(table, head + pending), head_size + grid.last_row - start + 1
+
+
+def paginate(tables, max_rows=None, repeat_head=False):
+    """
+    Lay tables out one below the other on sheets of at most max_rows rows, yielding the tables
+    of each sheet. A table that doesn't fit on what is left of a sheet is split by split_table
+    and continued on the next one. Only the tables of one sheet are held at a time.
+    """
+    if max_rows is None:
+        max_rows = MAX_ROWS
+    if not 0 < max_rows <= MAX_ROWS:
+        raise ValueError('max_rows has to be between 1 and {}, got {}'.format(MAX_ROWS, max_rows))
+    page, row = [], 1
+    for table in tables:
+        for part, height in split_table(table, max_rows, max_rows - row + 1, repeat_head):
+            if page and row + height - 1 > max_rows:
+                yield page
+                page, row = [], 1
+            page.append(part)
+            # Tables are separated by an empty row, as in measure_tables
+            row += height + 1
+    if page:
+        yield page
@@ -0,0 +1,250 @@
+"""
+A pass over a finished workbook, before it is saved, that makes the file smaller. Fonts, fills,
+borders, alignments and protections that are drawn the same are merged into one record and
+records no cell uses are dropped. Empty cells whose style draws nothing are left out of the
+file, and a column or row whose cells all have one such style gets it as its default instead,
+so that text typed into it later is formatted as before.
+"""
+from collections import defaultdict
+from copy import copy
+
+from openpyxl.styles.borders import DEFAULT_BORDER, Border, Side
+from openpyxl.styles.cell_style import StyleArray
+from openpyxl.styles.fills import FILL_SOLID, PatternFill
+from openpyxl.styles.protection import Protection
+from openpyxl.utils import get_column_letter
+from openpyxl.utils.indexed_list import IndexedList
+
+from tablepyxl.layout import DEFAULT_FONT_SIZE
+from tablepyxl.style import StyleRegistry, default_registry
+
+# The index of each kind of record in a style array, the list of the workbook holding them and
+# how many records at the start of the list are defaults that keep their place
+COMPONENTS = (
+    ('fontId', '_fonts', 1),
+    ('fillId', '_fills', 2),
+    ('borderId', '_borders', 1),
+    ('alignmentId', '_alignments', 1),
+    ('protectionId', '_protections', 1),
+)
+DEFAULT_PROTECTION = Protection()
+NO_SIDE = Side()
+
+
+def _side(side):
+    # A side without a style isn't drawn, whatever its color
+    return side if side is not None and side.style else NO_SIDE
+
+
+def normalize_border(border):
+    sides = [_side(side) for side in (border.left, border.right, border.top, border.bottom, border.diagonal)]
+    if all(side is NO_SIDE for side in sides) and not border.vertical and not border.horizontal:
+        return DEFAULT_BORDER
+    left, right, top, bottom, diagonal = sides
+    return Border(left=left, right=right, top=top, bottom=bottom, diagonal=diagonal,
+                  diagonalUp=border.diagonalUp, diagonalDown=border.diagonalDown, outline=border.outline,
+                  vertical=_side(border.vertical), horizontal=_side(border.horizontal))
+
+
+def normalize_fill(fill):
+    if not isinstance(fill, PatternFill):
+        return fill
+    if fill.fill_type is None:
+        return PatternFill()
+    if fill.fill_type == FILL_SOLID:
+        # Only the foreground color of a solid fill is drawn
+        return PatternFill(fill_type=FILL_SOLID, fgColor=fill.fgColor)
+    return fill
+
+
+NORMALIZERS = {
+    '_borders': normalize_border,
+    '_fills': normalize_fill,
+}
+
+
+class OptimizationReport(object):
+    """
+    What optimize_workbook removed. The style records are ``(before, after)`` counts.
+    """
+
+    def __init__(self):
+        self.records = {}
+        self.cell_styles = (0, 0)
+        self.empty_cells = 0
+        self.column_defaults = 0
+        self.row_defaults = 0
+
+    def as_dict(self):
+        return {
+            'records': dict(self.records),
+            'cell_styles': self.cell_styles,
+            'empty_cells': self.empty_cells,
+            'column_defaults': self.column_defaults,
+            'row_defaults': self.row_defaults,
+        }
+
+    def __repr__(self):
+        return '<OptimizationReport {}>'.format(self.as_dict())
+
+
+class StyleRemapper(object):
+    """
+    Rebuilds the style records of a workbook from the style arrays that refer to them: each
+    record is normalized and added once, in the order it is first used.
+    """
+
+    def __init__(self, wb):
+        self.wb = wb
+        self.records = {}
+        self._ids = {}
+        for attr, name, defaults in COMPONENTS:
+            old = getattr(wb, name)
+            normalize = NORMALIZERS.get(name)
+            new = IndexedList()
+            for record in old[:defaults]:
+                new.append(normalize(record) if normalize else record)
+            self.records[attr] = (old, new, normalize)
+            self._ids[attr] = {index: index for index in range(defaults)}
+        self._arrays = {}
+
+    def _id(self, attr, index):
+        ids = self._ids[attr]
+        new_index = ids.get(index)
+        if new_index is None:
+            old, new, normalize = self.records[attr]
+            record = old[index]
+            new_index = ids[index] = new.add(normalize(record) if normalize else record)
+        return new_index
+
+    def remap(self, array):
+        """
+        The array referring to the rebuilt records, shared by all equal arrays.
+        """
+        key = tuple(array)
+        remapped = self._arrays.get(key)
+        if remapped is None:
+            remapped = self._arrays[key] = StyleArray(array)
+            for attr, _, _ in COMPONENTS:
+                setattr(remapped, attr, self._id(attr, getattr(array, attr)))
+        return remapped
+
+    def draws_nothing(self, array):
+        """
+        Whether an empty cell with the style looks like one without any.
+        """
+        if array.pivotButton or array.quotePrefix:
+            return False
+        fill, border, protection, font = (self.records[attr][1][getattr(array, attr)]
+                                          for attr in ('fillId', 'borderId', 'protectionId', 'fontId'))
+        if fill != PatternFill() or border != DEFAULT_BORDER or protection != DEFAULT_PROTECTION:
+            return False
+        # Excel makes rows taller for the font of empty cells too
+        return font.sz is None or font.sz <= DEFAULT_FONT_SIZE
+
+    def apply(self):
+        for attr, name, _ in COMPONENTS:
+            setattr(self.wb, name, self.records[attr][1])
+        # Filled in from the cells when the workbook is saved, entries left from an earlier
+        # save would refer to the old records
+        self.wb._cell_styles = IndexedList([StyleArray()])
+
+    def counts(self):
+        return {name[1:]: (len(self.records[attr][0]), len(self.records[attr][1])) for attr, name, _ in COMPONENTS}
+
+
+def _is_empty(cell):
+    # Empty tds hold an empty string, which is written out but shows nothing either
+    return (cell._value in (None, '') and getattr(cell, '_comment', None) is None
+            and getattr(cell, '_hyperlink', None) is None)
+
+
+def _key(styled):
+    # None for anything without a style of its own
+    if styled is None or styled._style is None or not any(styled._style):
+        return None
+    return tuple(styled._style)
+
+
+def _optimize_worksheet(ws, remapper, report):
+    for cell in ws._cells.values():
+        if cell._style is not None:
+            cell._style = copy(remapper.remap(cell._style))
+    for dimension in list(ws.column_dimensions.values()) + list(ws.row_dimensions.values()):
+        if dimension._style is not None:
+            dimension._style = copy(remapper.remap(dimension._style))
+
+    invisible = {None: True}
+
+    def draws_nothing(key):
+        if key not in invisible:
+            invisible[key] = remapper.draws_nothing(StyleArray(key))
+        return invisible[key]
+
+    columns, rows = defaultdict(list), defaultdict(list)
+    empty = []
+    for (row, column), cell in ws._cells.items():
+        key = _key(cell)
+        columns[column].append(key)
+        rows[row].append(key)
+        if _is_empty(cell) and draws_nothing(key):
+            empty.append((row, column, key))
+    if not empty:
+        return
+
+    def hoist(dimensions, index, keys, size):
+        # The style all cells of a column or row have, none missing, when it draws nothing
+        if _key(dimensions.get(index)) is not None or len(keys) != size:
+            return
+        key = keys[0]
+        if key is not None and draws_nothing(key) and all(other == key for other in keys):
+            dimensions[index]._style = StyleArray(key)
+            return True
+
+    max_row, max_column = ws.max_row, ws.max_column
+    for column in {column for _, column, _ in empty}:
+        if hoist(ws.column_dimensions, get_column_letter(column), columns[column], max_row):
+            report.column_defaults += 1
+    for row in {row for row, _, _ in empty}:
+        if hoist(ws.row_dimensions, row, rows[row], max_column):
+            report.row_defaults += 1
+
+    for row, column, key in empty:
+        # A missing cell takes the style of its row or column, it can only go when that draws nothing too
+        defaults = (_key(ws.column_dimensions.get(get_column_letter(column))), _key(ws.row_dimensions.get(row)))
+        if key is None or all(draws_nothing(default) for default in defaults):
+            del ws._cells[row, column]
+            if key is not None:
+                report.empty_cells += 1
+
+
+def optimize_workbook(wb, registry=None):
+    """
+    Make a workbook smaller before it is saved and return an OptimizationReport. The workbook
+    can be written to afterwards, but the styles of the registry given, the workbook's own and
+    the default one are the only ones that know about the rebuilt records.
+    """
+    if wb.write_only:
+        raise ValueError('The cells of a write-only workbook are written as they are added, it can not be optimized')
+
+    report = OptimizationReport()
+    remapper = StyleRemapper(wb)
+    cell_styles = set()
+    for ws in wb.worksheets:
+        cell_styles.update(tuple(cell._style) for cell in ws._cells.values() if cell._style is not None)
+    for style in wb._named_styles:
+        style._style = copy(remapper.remap(style._style))
+    for ws in wb.worksheets:
+        _optimize_worksheet(ws, remapper, report)
+    remapper.apply()
+
+    after = set()
+    for ws in wb.worksheets:
+        after.update(tuple(cell._style) for cell in ws._cells.values() if cell._style is not None)
+    report.records = remapper.counts()
+    report.cell_styles = (len(cell_styles), len(after))
+
+    for known in (registry, default_registry, StyleRegistry.registered(wb)):
+        if known is not None:
+            known.forget(wb)
+    return report
@@ -0,0 +1,70 @@
+"""
+Tables built from rows of python values instead of html. Styles are css declarations, given as a
+string like a style attribute or as a dict, and go through the same conversion as the styles of
+an html table, so a table written from rows looks like the equivalent html table would.
+"""
+from collections.abc import Mapping
+
+from tablepyxl.style import Table, TableBody, TableCell, TableRow, parse_style
+
+
+def _declarations(style):
+    if not style:
+        return {}
+    if isinstance(style, str):
+        return dict(parse_style(style))
+    return dict(style)
+
+
+def _by_index(values):
+    if values is None:
+        return {}
+    if isinstance(values, Mapping):
+        return values
+    return dict(enumerate(values))
+
+
+def rows_to_table(rows, style=None, row_styles=None, column_styles=None, cell_styles=None, spans=None,
+                  column_classes=None):
+    """
+    Build a table from rows of values, as if each row were a tr and each value a td.
+
+    style holds the declarations of the table element. row_styles and column_styles map a row or
+    column index to declarations, or are sequences of them. A row's styles are inherited by its
+    cells, as in html, and a column's styles are applied to each of its cells under their own
+    cell_styles, which map (row, column) to declarations. spans maps (row, column) to (rowspan,
+    colspan). column_classes are the class attributes of a column's cells, e.g. 'TYPE_CURRENCY'.
+
+    Columns are indexes into the row as given, like the position of a td in its tr: values
+    covered by a span are left out of the rows, as they are in html.
+    """
+    row_styles = _by_index(row_styles)
+    column_styles = {column: _declarations(style) for column, style in _by_index(column_styles).items()}
+    cell_styles = cell_styles or {}
+    spans = spans or {}
+    column_classes = _by_index(column_classes)
+
+    table = Table.from_declarations(_declarations(style))
+    table.stylesheet = table.values = None
+    table.head = None
+    # Like a table without a tbody element, the body has the styles of the table
+    body = table.body = TableBody.from_declarations({}, parent=table)
+    body.stylesheet = body.values = None
+    body.cell_padding = body.get_dimension('padding') or 0
+
+    body.rows = []
+    for r, values in enumerate(rows):
+        row = TableRow.from_declarations(_declarations(row_styles.get(r)), parent=body)
+        row.stylesheet = row.values = None
+        row.cells = []
+        for c, value in enumerate(values):
+            declarations = column_styles.get(c, {})
+            cell_style = cell_styles.get((r, c))
+            if cell_style:
+                declarations = {**declarations, **_declarations(cell_style)}
+            rowspan, colspan = spans.get((r, c), (1, 1))
+            cell = TableCell.from_value(value, declarations, parent=row, rowspan=rowspan, colspan=colspan,
+                                        classes=column_classes.get(c, ''))
+            row.cells.append(cell)
+        body.rows.append(row)
+    return table
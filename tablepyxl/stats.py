@@ -0,0 +1,90 @@
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+class ConversionStats(object):
+    """
+    What a conversion did and where its time went. Pass one to document_to_workbook or
+    document_to_xl to have it filled in, nothing is measured otherwise.
+
+    The observer, if any, is called as ``observer(stage, seconds, stats)`` each time a stage
+    ends, e.g. to forward the timings to a monitoring system.
+    """
+
+    def __init__(self, observer=None):
+        self.observer = observer
+        self.timings = OrderedDict()
+        self.tables = 0
+        self.rows = 0
+        self.cells = 0
+        self.merges = 0
+        self.styles_created = 0
+        self.style_hits = 0
+        self.values_created = 0
+        self.value_hits = 0
+        self.bytes_written = None
+        # The OptimizationReport of the workbook, when it was optimized
+        self.optimization = None
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.timings[name] = self.timings.get(name, 0) + elapsed
+            if self.observer is not None:
+                self.observer(name, elapsed, self)
+
+    @contextmanager
+    def count_styles(self, registry):
+        hits, misses = registry.hits, registry.misses
+        try:
+            yield
+        finally:
+            self.style_hits += registry.hits - hits
+            self.styles_created += registry.misses - misses
+
+    def count_values(self, values):
+        self.value_hits += values.hits
+        self.values_created += values.misses
+
+    def count_row(self, slots):
+        self.rows += 1
+        for _, table_cell, anchor in slots:
+            if anchor:
+                self.cells += 1
+                if table_cell.rowspan > 1 or table_cell.colspan > 1:
+                    self.merges += 1
+
+    def as_dict(self):
+        return {
+            'timings': dict(self.timings),
+            'tables': self.tables,
+            'rows': self.rows,
+            'cells': self.cells,
+            'merges': self.merges,
+            'styles_created': self.styles_created,
+            'style_hits': self.style_hits,
+            'values_created': self.values_created,
+            'value_hits': self.value_hits,
+            'bytes_written': self.bytes_written,
+            'optimization': self.optimization.as_dict() if self.optimization is not None else None,
+        }
+
+    def __repr__(self):
+        return '<ConversionStats {}>'.format(self.as_dict())
+
+
+@contextmanager
+def no_stage():
+    yield
+
+
+def stage(stats, name):
+    """
+    Time a stage into stats, or nothing when there are none.
+    """
+    return stats.stage(name) if stats is not None else no_stage()
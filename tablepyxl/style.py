@@ -1,4 +1,9 @@
+import copy
+import functools
 import re
+import threading
+import weakref
+from collections import OrderedDict
 
 from lxml.html import HtmlElement
 from openpyxl.cell import cell as openpyxl_cell
@@ -6,10 +11,13 @@ from openpyxl.cell.rich_text import TextBlock, CellRichText
 from openpyxl.cell.text import InlineFont, Text
 from openpyxl.styles import Font, Alignment, PatternFill, NamedStyle, Border, Side, Color
 from openpyxl.styles.colors import BLACK
+from openpyxl.styles.cell_style import StyleArray
 from openpyxl.styles.fills import FILL_SOLID
-from openpyxl.styles.numbers import FORMAT_CURRENCY_USD_SIMPLE, FORMAT_PERCENTAGE
+from openpyxl.styles.numbers import (BUILTIN_FORMATS_MAX_SIZE, BUILTIN_FORMATS_REVERSE, FORMAT_CURRENCY_USD_SIMPLE,
+                                     FORMAT_PERCENTAGE)
 
 from tablepyxl.exceptions import IntNotFoundException
+from tablepyxl.values import convert, converter_for
 
 FORMAT_DATE_MM_DD_YYYY = 'mm/dd/yyyy'
 
@@ -20,6 +28,17 @@ STYLES_CONVERTER_DICT = {
     'size': 'font-size'
 }
 
+TABLE_STYLES_CONVERTER_DICT = {
+    'bgcolor': 'background-color: {0};',
+    'cellpadding': 'padding: {0}px;',
+    'border': 'border-top-width: {0}px; border-top-style: solid; border-top-color: #000000;'
+              'border-bottom-width: {0}px; border-bottom-style: solid; border-bottom-color: #000000;'
+              'border-left-width: {0}px; border-left-style: solid; border-left-color: #000000;'
+              'border-right-width: {0}px; border-right-style: solid; border-right-color: #000000;'
+}
+
+INT_RE = re.compile(r'\d+')
+
 basic_color_names = {
     'aliceblue': '#f0f8ff', 'antiquewhite': '#faebd7', 'aqua': '#00ffff', 'aquamarine': '#7fffd4', 'azure': '#f0ffff',
     'beige': '#f5f5dc', 'bisque': '#ffe4c4', 'black': '#000000', 'blanchedalmond': '#ffebcd', 'blue': '#0000ff',
@@ -71,9 +90,15 @@ def get_hex(color):
     return color
 
 
+def string_to_int(s):
+    if s.isdigit():
+        return int(s)
+    return 0
+
+
 def extract_first_int_from_str(string):
     try:
-        return re.findall(r'\d+', string)[0]
+        return INT_RE.findall(string)[0]
     except (IndexError, TypeError):
         raise IntNotFoundException(f"Can't found int value from string = {string}")
 
@@ -94,6 +119,14 @@ def style_string_to_dict(style):
     return dict(styles)
 
 
+@functools.lru_cache(maxsize=4096)
+def parse_style(style):
+    """
+    The declarations of a style attribute as an immutable tuple of pairs.
+    """
+    return tuple(style_string_to_dict(style).items())
+
+
 def get_side(style_dict, name):
     color = style_dict.get_color('border-{}-color'.format(name))
     style = style_dict.get('border-{}-style'.format(name))
@@ -124,9 +157,6 @@ def get_side(style_dict, name):
     }
 
 
-known_styles = {}
-
-
 def get_dimension(dimension):
     if dimension:
         unit = dimension[-2:]
@@ -139,66 +169,263 @@ def get_dimension(dimension):
     return dimension
 
 
-def style_dict_to_named_style(style_dict, number_format=None):
-    el = style_dict
-    parents = ''
-    while el.parent is not None:
-        parents += str(el.parent)
-        el = el.parent
-
-    style_and_format_string = str({
-        'style_dict': style_dict,
-        'parent': parents,
-        'number_format': number_format,
-    })
-    if style_and_format_string not in known_styles:
-        font = Font(
-            name=style_dict.get('font-family'),
-            size=get_dimension(style_dict.get('font-size')),
-            bold=style_dict.get('font-weight') in ['bold', '700'],
-            italic=style_dict.get('font-style') == 'italic',
-            color=style_dict.get_color('color', None),
-        )
+HORIZONTAL_ALIGNMENTS = ('right', 'justify', 'distributed', 'fill', 'centerContinuous', 'center', 'general', 'left')
+VERTICAL_ALIGNMENTS = ('bottom', 'center', 'justify', 'top', 'distributed')
+BORDER_SIDES = ('left', 'right', 'top', 'bottom', 'diagonal', 'outline')
 
-        horizontal = style_dict.get('text-align', 'general')
-        vertical = style_dict.get('vertical-align', 'top')
-        alignment = Alignment(
-            horizontal=horizontal if horizontal in (
-                'right', 'justify', 'distributed', 'fill', 'centerContinuous', 'center', 'general', 'left') else 'left',
-            vertical=vertical if vertical in (
-                'bottom', 'center', 'justify', 'top', 'distributed') else 'top',
-            # wrap_text=style_dict.get('white-space', 'nowrap') == 'wrap',
-            wrap_text=True,
-            # indent=get_dimension(style_dict.get('padding')) or 0.0
-        )
 
-        bg_color = style_dict.get_color('background-color')
-        fg_color = style_dict.get_color('foreground-color', Color())
+def normalize_border_key(sides):
+    """
+    ``(border_style, color)`` pairs with the color of the sides that aren't drawn dropped, they
+    look the same whatever it is.
+    """
+    return tuple((border_style, color if border_style else None) for border_style, color in sides)
+
+
+def resolve_style(style_dict):
+    """
+    The properties of a style dict that end up in the workbook, as a hashable
+    ``(font, alignment, fill, border)`` tuple.
+    """
+    font = (
+        style_dict.get('font-family'),
+        get_dimension(style_dict.get('font-size')),
+        style_dict.get('font-weight') in ['bold', '700'],
+        style_dict.get('font-style') == 'italic',
+        style_dict.get_color('color', None),
+    )
+
+    horizontal = style_dict.get('text-align', 'general')
+    vertical = style_dict.get('vertical-align', 'top')
+    alignment = (
+        horizontal if horizontal in HORIZONTAL_ALIGNMENTS else 'left',
+        vertical if vertical in VERTICAL_ALIGNMENTS else 'top',
+    )
+
+    bg_color = style_dict.get_color('background-color')
+    if bg_color and bg_color != 'transparent':
         fill_type = style_dict.get('fill-type', FILL_SOLID)
-        if bg_color and bg_color != 'transparent':
-            fill = PatternFill(
+        # A solid fill is drawn in one color, the other one would only tell identical fills apart
+        fg_color = style_dict.get_color('foreground-color') if fill_type != FILL_SOLID else None
+        fill = (fill_type, bg_color, fg_color)
+    else:
+        fill = None
+
+    border = normalize_border_key((side['border_style'], side['color'])
+                                  for side in (get_side(style_dict, name) for name in BORDER_SIDES))
+
+    return font, alignment, fill, border
+
+
+class StyleRegistry(object):
+    """
+    The styles of one workbook. Styles are keyed on their resolved properties and the fonts,
+    fills, borders and alignments they are built from are shared between styles. With a
+    maxsize, the least recently used styles are forgotten once it is reached.
+
+    Cells are styled directly with the font, fill, border, alignment and number format of their
+    style, unless named_styles is set: then every style is added to the workbook as a named
+    style ("Style 1", "Style 2", ...) and cells refer to it.
+    """
+
+    _workbook_registries = weakref.WeakKeyDictionary()
+    _workbook_registries_lock = threading.Lock()
+
+    def __init__(self, maxsize=None, named_styles=False):
+        self.maxsize = maxsize
+        self.named_styles = named_styles
+        self.hits = 0
+        self.misses = 0
+        self._styles = OrderedDict()
+        self._components = {}
+        # The style arrays of each workbook the styles are used in, by style key
+        self._arrays = weakref.WeakKeyDictionary()
+        self._count = 0
+        # Reentrant, styles are built with the lock held and build their borders through border()
+        self._lock = threading.RLock()
+
+    @classmethod
+    def for_workbook(cls, wb, maxsize=None, named_styles=False):
+        with cls._workbook_registries_lock:
+            registry = cls._workbook_registries.get(wb)
+            if registry is None:
+                registry = cls._workbook_registries[wb] = cls(maxsize=maxsize, named_styles=named_styles)
+        return registry
+
+    @classmethod
+    def registered(cls, wb):
+        """
+        The registry of a workbook, None when for_workbook was never called for it.
+        """
+        with cls._workbook_registries_lock:
+            return cls._workbook_registries.get(wb)
+
+    def __len__(self):
+        return len(self._styles)
+
+    @staticmethod
+    def _key(style_dict, number_format):
+        resolved = style_dict.key if isinstance(style_dict, ResolvedStyle) else resolve_style(style_dict)
+        return resolved + (number_format,)
+
+    def named_style(self, style_dict, number_format=None):
+        return self._named_style(self._key(style_dict, number_format))
+
+    def _named_style(self, key):
+        with self._lock:
+            style = self._styles.get(key)
+            if style is not None:
+                self.hits += 1
+                if self.maxsize is not None:
+                    self._styles.move_to_end(key)
+                return style
+
+            self.misses += 1
+            self._count += 1
+            style = self._build(key, 'Style {}'.format(self._count))
+            self._styles[key] = style
+            if self.maxsize is not None and len(self._styles) > self.maxsize:
+                self._styles.popitem(last=False)
+            return style
+
+    def style_array(self, wb, style_dict, number_format=None):
+        """
+        The style of a cell in a workbook, as the indexes of its font, fill, border, alignment and
+        number format in the lists of the workbook. Cells share one array per style and have to
+        be given a copy of it. With named_styles, the array refers to a copy of the named style
+        added to the workbook.
+        """
+        key = self._key(style_dict, number_format)
+        arrays = self._arrays.get(wb)
+        if arrays is None:
+            with self._lock:
+                arrays = self._arrays.setdefault(wb, {})
+        array = arrays.get(key)
+        if array is not None:
+            self.hits += 1
+            return array
+
+        # Looked up again with the lock held, another thread may have added it meanwhile
+        with self._lock:
+            array = arrays.get(key)
+            if array is not None:
+                self.hits += 1
+                return array
+            style = self._named_style(key)
+            if self.named_styles:
+                if style.name in wb.named_styles:
+                    named = wb._named_styles[style.name]
+                else:
+                    # A copy, binding a style to a workbook sets its indexes there and keeps the workbook alive
+                    named = NamedStyle(name=style.name, font=style.font, fill=style.fill, border=style.border,
+                                       alignment=style.alignment, number_format=style.number_format)
+                    wb.add_named_style(named)
+                arrays[key] = array = copy.copy(named.as_tuple())
+                return array
+            array = StyleArray()
+            array.fontId = wb._fonts.add(style.font)
+            array.fillId = wb._fills.add(style.fill)
+            array.borderId = wb._borders.add(style.border)
+            array.alignmentId = wb._alignments.add(style.alignment)
+            number_format = style.number_format
+            if number_format in BUILTIN_FORMATS_REVERSE:
+                array.numFmtId = BUILTIN_FORMATS_REVERSE[number_format]
+            else:
+                array.numFmtId = wb._number_formats.add(number_format) + BUILTIN_FORMATS_MAX_SIZE
+            arrays[key] = array
+            return array
+
+    def framed_style_array(self, wb, style_dict, number_format, frame):
+        """
+        The style array of a cell on the frame of its table: its own style, with the sides of the
+        frame it lies on as its border.
+        """
+        key = (self._key(style_dict, number_format), tuple(sorted(frame.items())))
+        with self._lock:
+            arrays = self._arrays.setdefault(wb, {})
+            array = arrays.get(key)
+            if array is None:
+                array = copy.copy(self.style_array(wb, style_dict, number_format))
+                array.borderId = wb._borders.add(self.framed_border(style_dict, frame))
+                arrays[key] = array
+            return array
+
+    def forget(self, wb):
+        """
+        Drop the style arrays of a workbook, after its records were rebuilt by optimize_workbook.
+        """
+        with self._lock:
+            self._arrays.pop(wb, None)
+
+    def _intern(self, kind, key, factory):
+        with self._lock:
+            component = self._components.get((kind, key))
+            if component is None:
+                component = self._components[(kind, key)] = factory()
+            return component
+
+    def _side(self, side):
+        border_style, color = side
+        return self._intern('side', side, lambda: Side(border_style=border_style, color=color))
+
+    def border(self, border_key):
+        """
+        The shared border for a ``(border_style, color)`` pair per side, in BORDER_SIDES order.
+        """
+        border = self._components.get(('border', border_key))
+        if border is None:
+            normalized = normalize_border_key(border_key)
+            left, right, top, bottom, diagonal, outline = (self._side(side) for side in normalized)
+            border = self._intern('border', normalized, lambda: Border(
+                left=left,
+                right=right,
+                top=top,
+                bottom=bottom,
+                diagonal=diagonal,
+                diagonal_direction=None,
+                outline=outline,
+                vertical=None,
+                horizontal=None
+            ))
+            with self._lock:
+                self._components[('border', border_key)] = border
+        return border
+
+    def framed_border(self, style_dict, frame):
+        """
+        The border of a style with some sides replaced by the frame of its table.
+        """
+        border_key = list(style_dict.key[3]) if style_dict is not None else [(None, None)] * len(BORDER_SIDES)
+        for name, side in frame.items():
+            border_key[BORDER_SIDES.index(name)] = side
+        return self.border(tuple(border_key))
+
+    def _build(self, key, name):
+        font_key, alignment_key, fill_key, border_key, number_format = key
+
+        family, size, bold, italic, color = font_key
+        font = self._intern('font', font_key, lambda: Font(name=family, size=size, bold=bold, italic=italic,
+                                                            color=color))
+
+        horizontal, vertical = alignment_key
+        # wrap_text=style_dict.get('white-space', 'nowrap') == 'wrap',
+        # indent=get_dimension(style_dict.get('padding')) or 0.0
+        alignment = self._intern('alignment', alignment_key, lambda: Alignment(horizontal=horizontal,
+                                                                               vertical=vertical, wrap_text=True))
+
+        if fill_key is not None:
+            fill_type, bg_color, fg_color = fill_key
+            fill = self._intern('fill', fill_key, lambda: PatternFill(
                 fill_type=fill_type,
                 start_color=bg_color,
-                end_color=fg_color
-            )
+                end_color=fg_color if fg_color is not None else Color()
+            ))
         else:
-            fill = PatternFill()
-
-        border = Border(
-            left=Side(**get_side(style_dict, 'left')),
-            right=Side(**get_side(style_dict, 'right')),
-            top=Side(**get_side(style_dict, 'top')),
-            bottom=Side(**get_side(style_dict, 'bottom')),
-            diagonal=Side(**get_side(style_dict, 'diagonal')),
-            diagonal_direction=None,
-            outline=Side(**get_side(style_dict, 'outline')),
-            vertical=None,
-            horizontal=None
-        )
+            fill = self._intern('fill', None, PatternFill)
 
-        name = 'Style {}'.format(len(known_styles) + 1)
+        border = self.border(border_key)
 
-        pyxl_style = NamedStyle(
+        return NamedStyle(
             name=name,
             font=font,
             fill=fill,
@@ -207,8 +434,97 @@ def style_dict_to_named_style(style_dict, number_format=None):
             number_format=number_format
         )
 
-        known_styles[style_and_format_string] = pyxl_style
-    return known_styles[style_and_format_string]
+
+# Used by callers outside of a conversion, conversions use the registry of their workbook
+default_registry = StyleRegistry(maxsize=1024)
+
+
+def style_dict_to_named_style(style_dict, number_format=None, registry=None):
+    if registry is None:
+        registry = default_registry
+    return registry.named_style(style_dict, number_format=number_format)
+
+
+def table_frame(style_dict):
+    """
+    The outer sides of a table that are drawn, as ``(border_style, color)`` pairs keyed by side name.
+    """
+    frame = {}
+    for name in ('top', 'bottom', 'left', 'right'):
+        side = get_side(style_dict, name)
+        if side['border_style'] or side['color']:
+            frame[name] = (side['border_style'], side['color'])
+    return frame
+
+
+def framed_border(style_dict, frame, registry=None):
+    if registry is None:
+        registry = default_registry
+    return registry.framed_border(style_dict, frame)
+
+
+def expand_border_shorthands(declarations):
+    converter_dict = {
+        'border': 'border-top-width: {0}px; border-top-style: {1}; border-top-color: {2}; '
+                  'border-bottom-width: {0}px; border-bottom-style: {1}; border-bottom-color: {2}; '
+                  'border-left-width: {0}px; border-left-style: {1}; border-left-color: {2}; '
+                  'border-right-width: {0}px; border-right-style: {1}; border-right-color: {2}; ',
+        'border-width': 'border-top-width: {0}px; '
+                  'border-bottom-width: {0}px; '
+                  'border-left-width: {0}px; '
+                  'border-right-width: {0}px; ',
+        'border-style': 'border-top-style: {0}; '
+                  'border-bottom-style: {0}; '
+                  'border-left-style: {0}; '
+                  'border-right-style: {0} ;',
+        'border-color': 'border-top-color: {0}; '
+                  'border-bottom-color: {0}; '
+                  'border-left-color: {0}; '
+                  'border-right-color: {0}; ',
+        'border-top': 'border-top-width: {0}px; '
+                      'border-top-style: {1}; '
+                      'border-top-color: {2}; ',
+        'border-bottom': 'border-bottom-width: {0}px; '
+                         'border-bottom-style: {1}; '
+                         'border-bottom-color: {2}; ',
+        'border-left': 'border-left-width: {0}px; '
+                       'border-left-style: {1}; '
+                       'border-left-color: {2}; ',
+        'border-right': 'border-right-width: {0}px; '
+                        'border-right-style: {1}; '
+                        'border-right-color: {2}; ',
+    }
+    styles_to_update = ''
+    for key in declarations.keys():
+        new_value = converter_dict.get(key)
+        if new_value:
+            value_list = declarations[key].split()
+            try:
+                first_arg = extract_first_int_from_str(value_list[0])  # width
+            except IntNotFoundException:
+                first_arg = value_list[0]
+            second_arg = value_list[1] if len(value_list) > 1 else 'solid'  # style
+            third_arg = value_list[2] if len(value_list) > 2 else '#000000'  # color
+
+            new_value = new_value.format(first_arg, second_arg, third_arg)
+            styles_to_update += new_value
+    return style_string_to_dict(styles_to_update)
+
+
+def expand_style_shorthands(declarations):
+    converter_dict = {
+        'background': 'background-color: {0}'
+    }
+
+    styles_to_update = ''
+    for key in declarations.keys():
+        new_value = converter_dict.get(key)
+        if new_value:
+            value_list = declarations[key].split()
+            first_arg = value_list[0]
+            new_value = new_value.format(first_arg)
+            styles_to_update += new_value
+    return style_string_to_dict(styles_to_update)
 
 
 class StyleDict(dict):
@@ -250,104 +566,180 @@ class StyleDict(dict):
         return get_hex(color)
 
     def convert_border(self):
-        converter_dict = {
-            'border': 'border-top-width: {0}px; border-top-style: {1}; border-top-color: {2}; '
-                      'border-bottom-width: {0}px; border-bottom-style: {1}; border-bottom-color: {2}; '
-                      'border-left-width: {0}px; border-left-style: {1}; border-left-color: {2}; '
-                      'border-right-width: {0}px; border-right-style: {1}; border-right-color: {2}; ',
-            'border-width': 'border-top-width: {0}px; '
-                      'border-bottom-width: {0}px; '
-                      'border-left-width: {0}px; '
-                      'border-right-width: {0}px; ',
-            'border-style': 'border-top-style: {0}; '
-                      'border-bottom-style: {0}; '
-                      'border-left-style: {0}; '
-                      'border-right-style: {0} ;',
-            'border-color': 'border-top-color: {0}; '
-                      'border-bottom-color: {0}; '
-                      'border-left-color: {0}; '
-                      'border-right-color: {0}; ',
-            'border-top': 'border-top-width: {0}px; '
-                          'border-top-style: {1}; '
-                          'border-top-color: {2}; ',
-            'border-bottom': 'border-bottom-width: {0}px; '
-                             'border-bottom-style: {1}; '
-                             'border-bottom-color: {2}; ',
-            'border-left': 'border-left-width: {0}px; '
-                           'border-left-style: {1}; '
-                           'border-left-color: {2}; ',
-            'border-right': 'border-right-width: {0}px; '
-                            'border-right-style: {1}; '
-                            'border-right-color: {2}; ',
-        }
-        styles_to_update = ''
-        for key in self.keys():
-            new_value = converter_dict.get(key)
-            if new_value:
-                value_list = self[key].split()
-                try:
-                    first_arg = extract_first_int_from_str(value_list[0])  # width
-                except IntNotFoundException:
-                    first_arg = value_list[0]
-                second_arg = value_list[1] if len(value_list) > 1 else 'solid'  # style
-                third_arg = value_list[2] if len(value_list) > 2 else '#000000'  # color
-
-                new_value = new_value.format(first_arg, second_arg, third_arg)
-                styles_to_update += new_value
-        if styles_to_update:
-            new_value_dict = style_string_to_dict(styles_to_update)
-            self.update(new_value_dict)
+        self.update(expand_border_shorthands(self))
 
     def convert_style(self):
-        converter_dict = {
-            'background': 'background-color: {0}'
-        }
+        self.update(expand_style_shorthands(self))
 
-        styles_to_update = ''
-        for key in self.keys():
-            new_value = converter_dict.get(key)
-            if new_value:
-                value_list = self[key].split()
-                first_arg = value_list[0]
-                new_value = new_value.format(first_arg)
-                styles_to_update += new_value
-        if styles_to_update:
-            new_value_dict = style_string_to_dict(styles_to_update)
-            self.update(new_value_dict)
+
+class ResolvedStyle(object):
+    """
+    The flattened styles of an element, its own declarations over those of its ancestors.
+    Elements with the same declarations and parent share one instance, which must not be
+    modified.
+    """
+    __slots__ = ('declarations', '_key')
+
+    def __init__(self, declarations):
+        self.declarations = declarations
+        self._key = None
+
+    @classmethod
+    def resolve(cls, declarations, parent=None):
+        return _resolve_style(tuple(declarations.items()), parent)
+
+    def __getitem__(self, item):
+        return self.declarations[item]
+
+    def __contains__(self, item):
+        return item in self.declarations
+
+    def __iter__(self):
+        return iter(self.declarations)
+
+    def get(self, k, d=None):
+        return self.declarations.get(k, d)
+
+    def get_color(self, k, d=None):
+        return get_hex(self.declarations.get(k, d))
+
+    @property
+    def key(self):
+        if self._key is None:
+            self._key = resolve_style(self)
+        return self._key
+
+
+@functools.lru_cache(maxsize=4096)
+def _resolve_style(items, parent):
+    declarations = dict(parent.declarations) if parent is not None else {}
+    declarations.update(items)
+    return ResolvedStyle(declarations)
+
+
+PLAIN_FONT = (None, None, None)
+
+
+@functools.lru_cache(maxsize=1024)
+def inline_font(bold, color, size):
+    # Shared between cells, rich text fonts must not be modified once built
+    return InlineFont(b=bold, color=color, sz=size)
+
+
+class ValueInterner(object):
+    """
+    The text and rich text values of the cells of one conversion. Reports repeat the same labels
+    over many cells, each distinct value is built once and shared by every cell holding it, so it
+    must not be modified. Only the first maxsize distinct values are kept, the rest are built as
+    they come. An interner belongs to one conversion and is not shared between threads.
+    """
+
+    def __init__(self, maxsize=65536):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._values = {}
+
+    def __len__(self):
+        return len(self._values)
+
+    def text(self, text):
+        value = self._values.get(text)
+        if value is not None:
+            self.hits += 1
+            return value
+        self.misses += 1
+        if len(self._values) < self.maxsize:
+            self._values[text] = text
+        return text
+
+    def rich_text(self, blocks):
+        """
+        The rich text of ``[(bold, color, size), text]`` blocks.
+        """
+        key = tuple((font, text) for font, text in blocks)
+        value = self._values.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        self.misses += 1
+        value = build_rich_text(blocks)
+        if len(self._values) < self.maxsize:
+            self._values[key] = value
+        return value
+
+
+def build_rich_text(blocks):
+    return CellRichText([TextBlock(font=inline_font(*font), text=text) for font, text in blocks])
 
 
 class Element(object):
-    def __init__(self, element, parent=None):
-        self.element = element
+    __slots__ = ('style_dict', 'number_format', '_style_cache')
+
+    STYLE_ATTRIBUTES = frozenset(STYLES_CONVERTER_DICT)
 
-        if self.__class__ != TableBody or self.element.tag != 'table':
-            self._attribs_to_style_attrib()
+    def __init__(self, element, parent=None, stylesheet=None):
+        if stylesheet is None and parent is not None:
+            stylesheet = parent.stylesheet
+
+        if not isinstance(self, TableBody) or element.tag != 'table':
+            attributes = tuple(item for item in element.items() if item[0] in self.STYLE_ATTRIBUTES)
+            rules = tuple(stylesheet.declarations(element).items()) if stylesheet is not None else ()
+            declarations = self._declarations(attributes, rules, element.get('style', ''))
+        else:
+            # A body without a tbody element is the table element itself, its styles are inherited
+            declarations = ()
+
+        self.number_format = None
+        parent_style = parent.style_dict if parent else None
+        self.style_dict = _resolve_style(declarations, parent_style)
+        self._style_cache = None
 
+    @classmethod
+    @functools.lru_cache(maxsize=4096)
+    def _declarations(cls, attributes, rules, style):
+        """
+        The expanded declarations of an element as an immutable tuple of pairs. Generated documents
+        repeat a few styles over many elements, each combination is parsed and expanded once.
+        """
+        # Attributes < stylesheet rules < inline style, the order Premailer inlines them in
+        declarations = style_string_to_dict(cls._attribs_to_styles(attributes))
+        declarations.update(rules)
+        declarations.update(parse_style(style))
+        return tuple(cls._expand_shorthands(declarations).items())
+
+    @classmethod
+    def from_declarations(cls, declarations, parent=None):
+        """
+        Build the element from css declarations instead of parsed markup, styled as an element
+        with the declarations in its style attribute would be.
+        """
+        self = cls.__new__(cls)
         self.number_format = None
         parent_style = parent.style_dict if parent else None
-        self.style_dict = StyleDict(style_string_to_dict(element.get('style', '')), parent=parent_style)
+        self.style_dict = ResolvedStyle.resolve(self._expand_shorthands(dict(declarations)), parent=parent_style)
         self._style_cache = None
+        return self
+
+    @staticmethod
+    def _expand_shorthands(declarations):
+        return declarations
 
-    def _attribs_to_style_attrib(self):
+    @staticmethod
+    def _attribs_to_styles(attributes):
         new_styles = ''
-        for attr_name, attr_value in self.element.attrib.items():
+        for attr_name, attr_value in attributes:
             new_attr_name = STYLES_CONVERTER_DICT.get(attr_name)
             if new_attr_name:
                 new_styles += f'{new_attr_name}: {attr_value};'
+        return new_styles
 
-        if not new_styles:
-            return
-
-        if not self.element.attrib.get('style'):
-            self.element.attrib['style'] = new_styles
-        else:
-            self.element.attrib['style'] = new_styles + self.element.attrib['style']
-
-    def style(self):
+    def style(self, registry=None):
         if not self._style_cache:
             self._style_cache = style_dict_to_named_style(
                 self.style_dict,
-                number_format=self.number_format
+                number_format=self.number_format,
+                registry=registry
             )
         return self._style_cache
 
@@ -362,76 +754,147 @@ class Element(object):
 
 
 class Table(Element):
-    def __init__(self, table):
-        super(Table, self).__init__(table)
+    __slots__ = ('stylesheet', 'values', 'head', 'body')
+
+    STYLE_ATTRIBUTES = frozenset(TABLE_STYLES_CONVERTER_DICT)
+
+    def __init__(self, table, stylesheet=None, values=None):
+        self.stylesheet = stylesheet
+        self.values = values
+        super(Table, self).__init__(table, stylesheet=stylesheet)
         table_head = table.find('thead')
         self.head = TableHead(table_head, parent=self) if table_head is not None else None
         table_body = table.find('tbody')
         self.body = TableBody(table_body if table_body is not None else table, parent=self)
 
-    def _attribs_to_style_attrib(self):
+    @staticmethod
+    def _attribs_to_styles(attributes):
         new_styles = ''
-
-        own_styles_converter_dict = {
-            'bgcolor': 'background-color: {0};',
-            'cellpadding': 'padding: {0}px;',
-            'border': 'border-top-width: {0}px; border-top-style: solid; border-top-color: #000000;'
-                      'border-bottom-width: {0}px; border-bottom-style: solid; border-bottom-color: #000000;'
-                      'border-left-width: {0}px; border-left-style: solid; border-left-color: #000000;'
-                      'border-right-width: {0}px; border-right-style: solid; border-right-color: #000000;'
-        }
-
-        for attr_name, attr_value in self.element.attrib.items():
-            style_name = own_styles_converter_dict.get(attr_name)
+        for attr_name, attr_value in attributes:
+            style_name = TABLE_STYLES_CONVERTER_DICT.get(attr_name)
             if style_name:
                 new_styles += style_name.format(
                     attr_value
                     if attr_name != 'border' else extract_first_int_from_str(attr_value)
                 )
-
-        if not new_styles:
-            return
-
-        if not self.element.attrib.get('style'):
-            self.element.attrib['style'] = new_styles
-        else:
-            self.element.attrib['style'] = new_styles + self.element.attrib['style']
+        return new_styles
 
 
 class TableHead(Element):
+    __slots__ = ('stylesheet', 'values', 'rows', 'cell_padding')
+
     def __init__(self, head, parent=None):
+        self.stylesheet = parent.stylesheet if parent is not None else None
+        self.values = parent.values if parent is not None else None
         super(TableHead, self).__init__(head, parent=parent)
         self.rows = [TableRow(tr, parent=self) for tr in head.findall('tr')]
         self.cell_padding = self.get_dimension('padding') or 0
 
 
 class TableBody(Element):
+    __slots__ = ('stylesheet', 'values', 'rows', 'cell_padding')
+
     def __init__(self, body, parent=None):
+        self.stylesheet = parent.stylesheet if parent is not None else None
+        self.values = parent.values if parent is not None else None
         super(TableBody, self).__init__(body, parent=parent)
         self.rows = [TableRow(tr, parent=self) for tr in body.findall('tr')]
         self.cell_padding = self.get_dimension('padding') or 0
 
 
 class TableRow(Element):
+    __slots__ = ('stylesheet', 'values', 'cells')
+
     def __init__(self, tr, parent=None):
+        self.stylesheet = parent.stylesheet if parent is not None else None
+        self.values = parent.values if parent is not None else None
         super(TableRow, self).__init__(tr, parent=parent)
         self.cells = [TableCell(td, parent=self) for td in tr.findall('th') + tr.findall('td')]
 
 
 class TableCell(Element):
+    """
+    The extracted contents of a td or th element. Everything needed to write the cell is
+    computed once when it is built, no reference to the parsed element is kept.
+    """
+    __slots__ = ('value', 'rowspan', 'colspan', '_data_type')
+
     CELL_TYPES = {'TYPE_STRING', 'TYPE_FORMULA', 'TYPE_NUMERIC', 'TYPE_BOOL', 'TYPE_CURRENCY', 'TYPE_PERCENTAGE',
                   'TYPE_NULL', 'TYPE_INLINE', 'TYPE_ERROR', 'TYPE_FORMULA_CACHE_STRING', 'TYPE_INTEGER'}
 
     def __init__(self, cell, parent=None):
-        self.cell = cell
-        self.value = self.element_to_string()
-        super(TableCell, self).__init__(self.cell, parent=parent)
-        self.number_format = self.get_number_format()
-        self.style_dict.convert_border()
-        self.style_dict.convert_style()
+        stylesheet = parent.stylesheet if parent is not None else None
+        values = parent.values if parent is not None else None
+        super(TableCell, self).__init__(cell, parent=parent)
+        self.rowspan = string_to_int(cell.get('rowspan', '1')) or 1
+        self.colspan = string_to_int(cell.get('colspan', '1')) or 1
+        self._set_value(self.element_to_string(cell, stylesheet, values), cell.get('class', ''))
+
+    def _set_value(self, value, classes):
+        self.value = value
+        self.number_format = None
+        if value is None:
+            # An empty cell has no type to force
+            self._data_type = None
+            return
+
+        # Values that aren't text already have their type, openpyxl sets the data type from it.
+        # Cells of a column share their class attribute, what it implies is worked out once per class.
+        is_text = isinstance(value, (str, CellRichText))
+        self._data_type = self.get_data_type(classes) if is_text else None
+        converter = converter_for(classes)
+        if converter is not None:
+            value = convert(str(value), converter) if is_text else value
+            if value is not None:
+                self.value = value
+                self._data_type = None
+            elif self._data_type == openpyxl_cell.TYPE_NUMERIC:
+                self._data_type = openpyxl_cell.TYPE_STRING
+        self.number_format = self.get_number_format(classes)
+        if self.number_format is None and converter is not None and self._data_type != openpyxl_cell.TYPE_STRING:
+            self.number_format = '#,##0' if isinstance(self.value, int) else '#,##0.##'
+        if self.number_format is None:
+            # The format openpyxl gives a date or time assigned to a cell, the cell's style replaces it
+            self.number_format = openpyxl_cell.TIME_FORMATS.get(type(self.value))
+
+    @classmethod
+    def from_value(cls, value, declarations, parent=None, rowspan=1, colspan=1, classes=''):
+        """
+        A cell holding a python value, styled by css declarations. classes has the meaning of the
+        class attribute of a td.
+        """
+        self = cls.from_declarations(declarations, parent=parent)
+        self.rowspan = rowspan
+        self.colspan = colspan
+        self._set_value(value, classes)
+        return self
+
+    def refill(self, cell, stylesheet=None, values=None):
+        """
+        A copy of this cell with the contents of another td or th element that has the same
+        markup. The style is shared, only the value and what depends on it are extracted.
+        """
+        filled = TableCell.__new__(TableCell)
+        filled.style_dict = self.style_dict
+        filled._style_cache = None
+        filled.rowspan = self.rowspan
+        filled.colspan = self.colspan
+        filled._set_value(self.element_to_string(cell, stylesheet, values), cell.get('class', ''))
+        return filled
+
+    @staticmethod
+    def _expand_shorthands(declarations):
+        declarations.update(expand_border_shorthands(declarations))
+        declarations.update(expand_style_shorthands(declarations))
+        return declarations
 
     def data_type(self):
-        cell_types = self.CELL_TYPES & set(self.element.get('class', '').split())
+        return self._data_type
+
+    @staticmethod
+    @functools.lru_cache(maxsize=256)
+    def get_data_type(classes):
+        cell_types = TableCell.CELL_TYPES & set(classes.split())
         if cell_types:
             if 'TYPE_FORMULA' in cell_types:
                 # Make sure TYPE_FORMULA takes precedence over the other classes in the set.
@@ -444,41 +907,66 @@ class TableCell(Element):
             cell_type = 'TYPE_STRING'
         return getattr(openpyxl_cell, cell_type)
 
-    def get_number_format(self):
-        if 'TYPE_CURRENCY' in self.element.get('class', '').split():
+    @staticmethod
+    @functools.lru_cache(maxsize=256)
+    def get_number_format(classes):
+        classes = set(classes.split())
+        if 'TYPE_CURRENCY' in classes:
             return FORMAT_CURRENCY_USD_SIMPLE
-        if 'TYPE_INTEGER' in self.element.get('class', '').split():
+        if 'TYPE_INTEGER' in classes:
             return '#,##0'
-        if 'TYPE_PERCENTAGE' in self.element.get('class', '').split():
+        if 'TYPE_PERCENTAGE' in classes:
             return FORMAT_PERCENTAGE
-        if 'TYPE_DATE' in self.element.get('class', '').split():
+        if 'TYPE_DATE' in classes:
             return FORMAT_DATE_MM_DD_YYYY
-        if self.data_type() == openpyxl_cell.TYPE_NUMERIC:
-            try:
-                int(self.value)
-            except ValueError:
-                return '#,##0.##'
-            else:
-                return '#,##0'
-
-    def format(self, cell):
-        cell.style = self.style()
-        data_type = self.data_type()
+        return None
+
+    def format(self, cell, registry=None, frame=None):
+        """
+        Style a cell, frame holds the sides of the frame of the table that the cell lies on.
+        """
+        if registry is None:
+            registry = default_registry
+        wb = cell.parent.parent
+        if frame:
+            array = registry.framed_style_array(wb, self.style_dict, self.number_format, frame)
+        else:
+            array = registry.style_array(wb, self.style_dict, self.number_format)
+        # Copied, the array of a cell is changed in place when one of its styles is set
+        cell._style = copy.copy(array)
+        data_type = self._data_type
         if data_type:
             try:
                 cell.data_type = data_type
             except AttributeError:
                 pass
 
-    def element_to_string(self):
-        rich_cell_text = self._element_to_string(self.cell)
-        if rich_cell_text[-1].text == '\n':
-            del rich_cell_text[-1]
-        return rich_cell_text
+    @classmethod
+    def element_to_string(cls, cell, stylesheet=None, values=None):
+        """
+        The value of a td or th element, shared with the cells of the same values with the same
+        contents when an interner is given.
+        """
+        blocks = cls._text_blocks(cell, stylesheet)
+        tail = cell.tail.strip("&nbsp; ") if cell.tail else ''
+        if tail:
+            blocks.append([PLAIN_FONT, tail])
+        if blocks and blocks[-1][1] == '\n':
+            del blocks[-1]
+
+        # Cells without any formatting are plain strings, which are far cheaper to write
+        if all(font == PLAIN_FONT for font, _ in blocks):
+            text = ''.join(text for _, text in blocks)
+            return values.text(text) if values is not None else text
+        return values.rich_text(blocks) if values is not None else build_rich_text(blocks)
 
     @staticmethod
-    def extract_styles_from_font(font_tag):
-        style_dict = StyleDict(style_string_to_dict(font_tag.get('style', '')))
+    def extract_styles_from_font(font_tag, stylesheet=None):
+        declarations = {}
+        if stylesheet is not None:
+            declarations.update(stylesheet.declarations(font_tag))
+        declarations.update(parse_style(font_tag.get('style', '')))
+        style_dict = StyleDict(declarations)
 
         color = style_dict.get('color')
         size = style_dict.get('font-size')
@@ -494,36 +982,45 @@ class TableCell(Element):
 
         return color, size
 
-    def _element_to_string(self, el):
-        text_blocks = CellRichText()
-        for x in el.iterchildren():
-            child_text_blocks = self._element_to_string(x)
-            text_blocks += child_text_blocks
-
-        text = el.text if el.text else ''
-        tail = el.tail if el.tail else ''
-
-        text = text.strip("&nbsp; ")
-        tail = tail.strip("&nbsp; ")
-
-        font_style = InlineFont()
-        if el.tag == 'font':
-            color, size = self.extract_styles_from_font(el)
-            font_style = InlineFont(color=color, sz=size)
-        elif el.tag == 'b':
-            font_style = InlineFont(b=True)
-
-        result = CellRichText()
-
-        result.append(TextBlock(font=font_style, text=text))
-        for text_block in text_blocks:
-            if font_style.b and not text_block.font.b:
-                text_block.font.b = font_style.b if font_style.b and not text_block.font.b else text_block.font.b
-            elif font_style.color and not text_block.font.color:
-                text_block.font.color = font_style.color
-        result += text_blocks
-
-        if tail:
-            result.append(TextBlock(font=InlineFont(), text=tail))
-
-        return result
+    @classmethod
+    def _text_blocks(cls, cell, stylesheet=None):
+        """
+        The text of a cell as ``[(bold, color, size), text]`` blocks in document order, adjacent
+        blocks with the same font merged. Bold and color are inherited from enclosing <b> and
+        <font> elements, the size only applies to the text directly inside a <font>.
+        """
+        blocks = []
+
+        def add(font, text):
+            text = text.strip("&nbsp; ") if text else ''
+            if not text:
+                return
+            if blocks and blocks[-1][0] == font:
+                blocks[-1][1] += text
+            else:
+                blocks.append([font, text])
+
+        add(PLAIN_FONT, cell.text)
+        # Each entry holds an element, its remaining children and the (bold, color) they inherit
+        stack = [(cell, iter(cell), (None, None))]
+        while stack:
+            element, children, inherited = stack[-1]
+            child = next(children, None)
+            if child is None:
+                stack.pop()
+                if stack:
+                    bold, color = stack[-1][2]
+                    add((bold, color, None), element.tail)
+                continue
+
+            bold, color = inherited
+            size = None
+            if child.tag == 'b':
+                bold = True
+            elif child.tag == 'font':
+                own_color, size = cls.extract_styles_from_font(child, stylesheet)
+                color = own_color or color
+            add((bold, color, size), child.text)
+            stack.append((child, iter(child), (bold, color)))
+
+        return blocks
@@ -1,164 +1,472 @@
+import os
+from datetime import datetime, timezone
+from io import BytesIO
+from zipfile import ZIP_DEFLATED, ZIP_STORED, ZipFile
+
 from lxml import html
 from openpyxl import Workbook
-from openpyxl.cell import MergedCell
-from openpyxl.styles import Border, Side
+from openpyxl.cell import MergedCell, WriteOnlyCell
 from openpyxl.utils import get_column_letter
-from premailer import Premailer
-
-from tablepyxl.style import Table, get_side
+from openpyxl.worksheet.cell_range import CellRange
+from openpyxl.worksheet.merge import MergedCellRange
+from openpyxl.writer.excel import ExcelWriter
 
+from tablepyxl.css import document_stylesheet, has_external_stylesheet
+from tablepyxl.fastwriter import ENGINES, FastWorkbookWriter
+from tablepyxl.incremental import iter_tables
+from tablepyxl.layout import Autosizer, SpanGrid, frame_edges, measure_tables, paginate
+from tablepyxl.optimize import optimize_workbook
+from tablepyxl.stats import ConversionStats, stage
+from tablepyxl.style import StyleRegistry, Table, ValueInterner, framed_border, table_frame
 
-def string_to_int(s):
-    if s.isdigit():
-        return int(s)
-    return 0
 
-
-def get_tables(doc):
+def parse_document(doc):
     tree = html.fromstring(doc)
     comments = tree.xpath('//comment()')
     for comment in comments:
         comment.drop_tag()
-    tables = tree.xpath('//table[not(ancestor::table)]')
-    result = [Table(table) for table in tables]
+    return tree
+
+
+def get_tables(doc, values=None, stats=None):
+    """
+    The top level tables of an html document. Cells with the same text share their value when
+    a ValueInterner is given. With stats, parsing the document, compiling its stylesheet and
+    building the tables are timed as the parse, stylesheet and tables stages.
+    """
+    with stage(stats, 'parse'):
+        tree = parse_document(doc)
+    with stage(stats, 'stylesheet'):
+        stylesheet = document_stylesheet(tree)
+    # The styles of each element are resolved as it is built
+    with stage(stats, 'tables'):
+        tables = tree.xpath('//table[not(ancestor::table)]')
+        result = [Table(table, stylesheet=stylesheet, values=values) for table in tables]
     return result
 
 
 class TableToWorksheet:
-    def __init__(self, worksheet, table):
+    def __init__(self, worksheet, table, registry=None, sizes=None, stats=None):
         self.worksheet = worksheet
         self.table = table
+        self.registry = registry
+        self.sizes = sizes if sizes is not None else Autosizer()
+        self.stats = stats
 
-    def write_cell(self, table_cell, row, column):
-        cell = self.worksheet.cell(row=row, column=column)
-
-        colspan = string_to_int(table_cell.element.get("colspan", "1"))
-        rowspan = string_to_int(table_cell.element.get("rowspan", "1"))
-
-        cell_arr = [len(i) for i in str(table_cell.value).split('\n')]
-        height_cell = int(len(cell_arr) * 15)
-        width_cell = max(cell_arr) + 2
-
-        while isinstance(cell, MergedCell):
-            width = max(
-                self.worksheet.column_dimensions[get_column_letter(column)].width or 0,
-                width_cell // colspan + 1
-            )
-            self.worksheet.column_dimensions[get_column_letter(column)].width = width
-
-            table_cell.format(cell)
-            column += 1
-            cell = self.worksheet.cell(row=row, column=column)
+    def write_cell(self, table_cell, row, column, anchor):
+        if not anchor:
+            # The grid never overlaps spans, so the merged placeholder is created directly instead of
+            # going through merge_cells, which rescans every existing range on each call
+            cell = self.worksheet._cells[row, column] = MergedCell(self.worksheet, row, column)
+            return cell
 
+        cell = self.worksheet.cell(row=row, column=column)
+        rowspan, colspan = table_cell.rowspan, table_cell.colspan
         if rowspan > 1 or colspan > 1:
-            self.worksheet.merge_cells(start_row=row, start_column=column,
-                                       end_row=row + rowspan - 1, end_column=column + colspan - 1)
+            self.worksheet.merged_cells.ranges.add(MergedCellRange(self.worksheet, CellRange(
+                min_row=row, min_col=column, max_row=row + rowspan - 1, max_col=column + colspan - 1).coord))
 
         cell.value = table_cell.value
-        table_cell.format(cell)
-
-        width = max(self.worksheet.column_dimensions[get_column_letter(column)].width, width_cell // colspan + 1)
-        self.worksheet.column_dimensions[get_column_letter(column)].width = width
-        self.worksheet.row_dimensions[row].height = max(self.worksheet.row_dimensions[row].height or 15, height_cell)
-
-        return column
+        self.sizes.add(table_cell, row, column)
+        return cell
 
     def write_rows(self, row, column=1):
         elem = self.table.body
+        frame = table_frame(self.table.style_dict)
+
+        # Coordinates and merge ranges come from the html table model, the sheet is never probed for them
+        grid = SpanGrid(row, column)
+        # Cells that can be on the frame are styled once the extent of the table is known: the ends of
+        # each row, every cell of the first row, and the other cells of a row until the next one comes
+        framed = []
+        inner = []
+        for row, slots in grid.place_rows(elem.rows):
+            for _, _, cell, table_cell in inner:
+                table_cell.format(cell, self.registry)
+            inner = []
+            for index, (column, table_cell, anchor) in enumerate(slots):
+                cell = self.write_cell(table_cell, row, column, anchor)
+                if not frame:
+                    table_cell.format(cell, self.registry)
+                elif row == grid.first_row or index in (0, len(slots) - 1):
+                    framed.append((row, column, cell, table_cell))
+                else:
+                    inner.append((row, column, cell, table_cell))
+            if self.stats is not None:
+                self.stats.count_row(slots)
+        # The cells of the last row are on the frame after all
+        framed.extend(inner)
+
+        if frame:
+            self.set_external_borders(grid, frame, framed)
+
+        return grid.last_row + 1
+
+    def set_external_borders(self, grid, frame, framed):
+        written = set()
+        for row, column, cell, table_cell in framed:
+            # Each frame cell is styled once, its own style with every side of the frame it lies on as its border
+            table_cell.format(cell, self.registry, frame_edges(grid, row, column, frame))
+            written.add((row, column))
+
+        for row in range(grid.first_row, grid.last_row + 1):
+            if row in (grid.first_row, grid.last_row):
+                columns = range(grid.first_column, grid.last_column + 1)
+            else:
+                columns = {grid.first_column, grid.last_column}
+            for column in columns:
+                edges = frame_edges(grid, row, column, frame)
+                if edges and (row, column) not in written:
+                    # A cell of the frame that no table cell reaches only has the border
+                    self.worksheet.cell(row, column).border = framed_border(None, edges, self.registry)
+
+
+class TableToWriteOnlyWorksheet:
+    def __init__(self, worksheet, table, layout, registry=None, stats=None):
+        self.worksheet = worksheet
+        self.table = table
+        self.layout = layout
+        self.registry = registry
+        self.stats = stats
+
+    def write_rows(self):
+        layout = self.layout
+        frame = table_frame(self.table.style_dict)
+
+        grid = SpanGrid(layout.first_row, layout.first_column)
+        for row, slots in grid.place_rows(self.table.body.rows):
+            cells = [None] * layout.last_column
+            for column, table_cell, anchor in slots:
+                edges = frame_edges(layout, row, column, frame) if frame else None
+                cells[column - 1] = self.write_cell(table_cell, row, column, anchor, edges)
+            if self.stats is not None:
+                self.stats.count_row(slots)
+            if frame:
+                self.set_external_borders(cells, row, frame)
+
+            height = layout.row_heights.get(row)
+            if height:
+                self.worksheet.row_dimensions[row].height = height
+            self.worksheet.append(cells)
+            # Rows are flushed on append, their dimensions are not needed afterwards
+            self.worksheet.row_dimensions.pop(row, None)
+
+        return grid.row
+
+    def write_cell(self, table_cell, row, column, anchor, frame=None):
+        cell = WriteOnlyCell(self.worksheet)
+        if anchor:
+            rowspan, colspan = table_cell.rowspan, table_cell.colspan
+            if rowspan > 1 or colspan > 1:
+                self.worksheet.merged_cells.add(CellRange(min_row=row, min_col=column,
+                                                          max_row=row + rowspan - 1, max_col=column + colspan - 1))
+            cell.value = table_cell.value
+        # Covered cells take the style of the cell that spans them so the merged range is drawn as one
+        table_cell.format(cell, self.registry, frame)
+        return cell
+
+    def set_external_borders(self, cells, row, frame):
+        layout = self.layout
+        for column in range(layout.first_column, layout.last_column + 1):
+            edges = frame_edges(layout, row, column, frame)
+            if edges and cells[column - 1] is None:
+                # A cell of the frame that no table cell reaches only has the border
+                cell = cells[column - 1] = WriteOnlyCell(self.worksheet)
+                cell.border = framed_border(None, edges, self.registry)
+
+
+def tables_to_write_only_sheet(tables, wb, layouts=None, registry=None, stats=None):
+    worksheet = wb.create_sheet()
 
-        initial_row = row
-        initial_column = column
+    # Column widths have to be known before the first row is streamed out
+    if layouts is None:
+        layouts = measure_tables(tables)
+
+    column_widths = {}
+    for layout in layouts:
+        for column, width in layout.column_widths.items():
+            column_widths[column] = max(column_widths.get(column, 0), width)
+    for column, width in sorted(column_widths.items()):
+        worksheet.column_dimensions[get_column_letter(column)].width = width
+
+    row = 1
+    for table, layout in zip(tables, layouts):
+        while row < layout.first_row:
+            worksheet.append([])
+            row += 1
+        row = TableToWriteOnlyWorksheet(worksheet, table, layout, registry, stats).write_rows()
+        if stats is not None:
+            stats.tables += 1
 
-        for i in range(1, len(elem.rows) + 1):
-            self.worksheet.row_dimensions[i].height = 15
 
-        for table_row in elem.rows:
-            column = initial_column
-            for table_cell in table_row.cells:
-                column = self.write_cell(table_cell, row, column)
-                column += 1
-            row += 1
+def tables_to_sheet(tables, wb, layouts=None, registry=None, stats=None):
+    if registry is None:
+        registry = StyleRegistry.for_workbook(wb)
+    if wb.write_only:
+        return tables_to_write_only_sheet(tables, wb, layouts=layouts, registry=registry, stats=stats)
 
-        self.set_external_top_border(start_column=initial_column, end_column=column - 1, row=initial_row)
-        self.set_external_bottom_border(start_column=initial_column, end_column=column - 1, row=row - 1)
-        self.set_external_left_border(start_row=initial_row, end_row=row - 1, column=initial_column)
-        self.set_external_right_border(start_row=initial_row, end_row=row - 1, column=column - 1)
-
-        return row
-
-    def set_external_top_border(self, start_column, end_column, row):
-        top = get_side(self.table.style_dict, 'top')
-        if top['border_style'] or top['color']:
-            top = Side(**top)
-            for column in range(start_column, end_column + 1):
-                cell = self.worksheet.cell(row, column)
-                bottom = Side(**cell.border.bottom.__dict__)
-                left = Side(**cell.border.left.__dict__)
-                right = Side(**cell.border.right.__dict__)
-
-                cell.border = Border(left=left, right=right, top=top, bottom=bottom)
-
-    def set_external_bottom_border(self, start_column, end_column, row):
-        bottom = get_side(self.table.style_dict, 'bottom')
-        if bottom['border_style'] or bottom['color']:
-            bottom = Side(**bottom)
-            for column in range(start_column, end_column + 1):
-                cell = self.worksheet.cell(row, column)
-                top = Side(**cell.border.top.__dict__)
-                left = Side(**cell.border.left.__dict__)
-                right = Side(**cell.border.right.__dict__)
-
-                cell.border = Border(left=left, right=right, top=top, bottom=bottom)
-
-    def set_external_left_border(self, start_row, end_row, column):
-        left = get_side(self.table.style_dict, 'left')
-        if left['border_style'] or left['color']:
-            left = Side(**left)
-            for row in range(start_row, end_row + 1):
-                cell = self.worksheet.cell(row, column)
-                top = Side(**cell.border.top.__dict__)
-                bottom = Side(**cell.border.bottom.__dict__)
-                right = Side(**cell.border.right.__dict__)
-
-                cell.border = Border(left=left, right=right, top=top, bottom=bottom)
-
-    def set_external_right_border(self, start_row, end_row, column):
-        right = get_side(self.table.style_dict, 'right')
-        if right['border_style'] or right['color']:
-            right = Side(**right)
-            for row in range(start_row, end_row + 1):
-                cell = self.worksheet.cell(row, column)
-                top = Side(**cell.border.top.__dict__)
-                left = Side(**cell.border.left.__dict__)
-                bottom = Side(**cell.border.bottom.__dict__)
-
-                cell.border = Border(left=left, right=right, top=top, bottom=bottom)
-
-
-def tables_to_sheet(tables, wb):
     worksheet = wb.create_sheet()
+    # Dimensions are only known once every table is written, they are set once at the end
+    sizes = Autosizer()
     row, column = 1, 1
     for table in tables:
-        table_to_worksheet = TableToWorksheet(worksheet, table)
+        table_to_worksheet = TableToWorksheet(worksheet, table, registry, sizes, stats)
         # if table.head:
         #     row = table_to_worksheet.write_rows(worksheet, table.style_dict, row, column)
         if table.body:
             row = table_to_worksheet.write_rows(row, column)
         row += 1
+        if stats is not None:
+            stats.tables += 1
+    sizes.apply(worksheet, range(1, worksheet.max_column + 1))
+
+
+def tables_to_sheets(tables, wb, max_rows=None, repeat_head=False, registry=None, stats=None):
+    """
+    Write tables to as many sheets as they need, a new sheet is started where the next table
+    would go past max_rows, the size of a sheet by default. Longer tables are split between
+    sheets, see layout.paginate. Tables are built one sheet at a time.
+    """
+    if registry is None:
+        registry = StyleRegistry.for_workbook(wb)
+    pages = 0
+    for page in paginate(tables, max_rows, repeat_head):
+        tables_to_sheet(page, wb, registry=registry, stats=stats)
+        pages += 1
+    if not pages:
+        # Without tables there is still a sheet, as there is when they aren't split
+        tables_to_sheet([], wb, registry=registry, stats=stats)
+
+
+def _write_tables(tables, wb, layouts=None, registry=None, stats=None, max_rows=None, repeat_head=False):
+    if max_rows is None and not repeat_head:
+        return tables_to_sheet(tables, wb, layouts=layouts, registry=registry, stats=stats)
+    return tables_to_sheets(tables, wb, max_rows, repeat_head, registry=registry, stats=stats)
+
+
+def new_workbook(streaming=False):
+    wb = Workbook(write_only=streaming)
+    if not streaming:
+        wb.remove(wb.active)
+    return wb
 
 
-def document_to_workbook(doc, wb=None, base_url=None):
+def tables_to_workbook(tables, wb=None, streaming=False, registry=None, stats=None, observer=None, max_rows=None,
+                       repeat_head=False, named_styles=False):
+    """
+    Write tables built without markup, e.g. by tablepyxl.rows.rows_to_table, to a new sheet, or to
+    new sheets of at most max_rows rows each.
+    """
     if not wb:
-        wb = Workbook()
-        wb.remove(wb.active)
+        wb = new_workbook(streaming)
+    if registry is None:
+        registry = StyleRegistry.for_workbook(wb, named_styles=named_styles)
+    if stats is None and observer is not None:
+        stats = ConversionStats(observer)
+    if stats is None:
+        _write_tables(list(tables), wb, registry=registry, max_rows=max_rows, repeat_head=repeat_head)
+        return wb
+
+    with stats.count_styles(registry), stats.stage('write'):
+        _write_tables(list(tables), wb, registry=registry, stats=stats, max_rows=max_rows, repeat_head=repeat_head)
+    return wb
+
+
+def document_to_workbook(doc, wb=None, base_url=None, streaming=False, incremental=False, registry=None,
+                         stats=None, observer=None, template=None, max_rows=None, repeat_head=False,
+                         named_styles=False):
+    """
+    Write the tables of a document to a new sheet of a workbook. With max_rows they are split
+    between as many sheets of at most max_rows rows as they need instead, with repeat_head the
+    head rows of a table are written at the top of every sheet it is on.
+
+    Cells are styled directly, with named_styles each distinct style is added to the workbook
+    as a named style instead. A registry given has its own setting.
+    """
+    if not wb:
+        wb = new_workbook(streaming)
+    if registry is None:
+        registry = StyleRegistry.for_workbook(wb, named_styles=named_styles)
+    if stats is None and observer is not None:
+        stats = ConversionStats(observer)
+    # Repeated cell text is kept once for the whole conversion
+    values = ValueInterner()
+    if stats is None:
+        return _document_to_workbook(doc, wb, base_url, incremental, registry, template=template, max_rows=max_rows,
+                                     repeat_head=repeat_head, values=values)
+
+    with stats.count_styles(registry):
+        wb = _document_to_workbook(doc, wb, base_url, incremental, registry, stats, template, max_rows,
+                                   repeat_head, values)
+    stats.count_values(values)
+    return wb
+
 
-    inline_styles_doc = Premailer(doc, base_url=base_url, remove_classes=False).transform()
-    tables = get_tables(inline_styles_doc)
-    tables_to_sheet(tables, wb)
+def _document_to_workbook(doc, wb, base_url, incremental, registry, stats=None, template=None, max_rows=None,
+                          repeat_head=False, values=None):
+    if template is not None and not incremental:
+        # A document with the structure of the template only has its values extracted
+        with stage(stats, 'parse'):
+            tables = template.render(doc, values)
+        if tables is not None:
+            with stage(stats, 'write'):
+                _write_tables(tables, wb, registry=registry, stats=stats, max_rows=max_rows,
+                              repeat_head=repeat_head)
+            return wb
+
+    doc = inline_external_stylesheets(doc, base_url, stats)
+    if incremental:
+        # A write-only sheet needs the layout up front, measure it on a first parse of the document.
+        # Split tables are measured one sheet at a time instead.
+        layouts = None
+        if wb.write_only and max_rows is None and not repeat_head:
+            with stage(stats, 'measure'):
+                layouts = measure_tables(iter_tables(doc))
+        # Tables are parsed as they are written, parsing is part of the write stage
+        with stage(stats, 'write'):
+            _write_tables(iter_tables(doc, values), wb, layouts=layouts, registry=registry, stats=stats,
+                          max_rows=max_rows, repeat_head=repeat_head)
+    else:
+        tables = get_tables(doc, values, stats)
+        with stage(stats, 'write'):
+            _write_tables(tables, wb, registry=registry, stats=stats, max_rows=max_rows, repeat_head=repeat_head)
     return wb
 
 
-def document_to_xl(doc, filename, base_url=None):
-    doc = doc.replace('\n', "").replace('<br>', '\n').replace('<br />', '\n')
-    wb = document_to_workbook(doc, base_url=base_url)
-    wb.save(filename)
+def inline_external_stylesheets(doc, base_url=None, stats=None):
+    # <style> blocks are resolved natively while the tables are built, Premailer is only
+    # needed to fetch and inline linked stylesheets
+    if has_external_stylesheet(doc):
+        # Premailer and what it depends on take longer to import than most conversions take
+        from premailer import Premailer
+        with stage(stats, 'inline'):
+            doc = Premailer(doc, base_url=base_url, remove_classes=False).transform()
+    return doc
+
+
+def prepare_document(doc):
+    return doc.replace('\n', "").replace('<br>', '\n').replace('<br />', '\n')
+
+
+def save_workbook(wb, output, compresslevel=None):
+    """
+    Save a workbook to a path or to a binary file-like object, which doesn't need to be
+    seekable. The compresslevel trades speed for size: 0 stores the parts uncompressed,
+    1 to 9 deflate them from fastest to smallest. The default is deflate's own default.
+    """
+    if wb.write_only and not wb.worksheets:
+        wb.create_sheet()
+    compression = ZIP_STORED if compresslevel == 0 else ZIP_DEFLATED
+    archive = ZipFile(output, 'w', compression, allowZip64=True, compresslevel=compresslevel or None)
+    wb.properties.modified = datetime.now(tz=timezone.utc).replace(tzinfo=None)
+    ExcelWriter(wb, archive).save()
+
+
+def _optimize(wb, stats):
+    with stage(stats, 'optimize'):
+        report = optimize_workbook(wb)
+    if stats is not None:
+        stats.optimization = report
+
+
+def _save(save, output, stats):
+    is_path = isinstance(output, (str, os.PathLike))
+    # Streams like sockets may not even have seekable()
+    seekable = not is_path and getattr(output, 'seekable', lambda: False)()
+    start = output.tell() if stats is not None and seekable else None
+    with stage(stats, 'save'):
+        save(output)
+    if stats is not None:
+        if is_path:
+            stats.bytes_written = os.path.getsize(output)
+        elif start is not None:
+            stats.bytes_written = output.tell() - start
+
+
+def document_to_xl(doc, filename, base_url=None, streaming=False, incremental=False, stats=None, observer=None,
+                   compresslevel=None, template=None, engine='openpyxl', max_rows=None, repeat_head=False,
+                   named_styles=False, optimize=False):
+    """
+    Write the tables of a document to an xlsx file. The filename is a path or a binary file-like
+    object. The 'fast' engine serializes the tables directly instead of building an openpyxl workbook,
+    streaming is implied, and named_styles has no effect. See document_to_workbook for max_rows,
+    repeat_head and named_styles.
+
+    With optimize the workbook goes through optimize_workbook before it is saved, the report is
+    kept in stats. It needs the whole workbook, so it can't be combined with streaming.
+    """
+    if engine not in ENGINES:
+        raise ValueError('Unknown engine {!r}, expected one of {}'.format(engine, ', '.join(ENGINES)))
+    if optimize and (streaming or engine == 'fast'):
+        raise ValueError('optimize needs the whole workbook, it is not available with streaming or the fast engine')
+    if stats is None and observer is not None:
+        stats = ConversionStats(observer)
+    doc = prepare_document(doc)
+    if engine == 'fast':
+        return _document_to_xl_fast(doc, filename, base_url, incremental, stats, compresslevel, template, max_rows,
+                                    repeat_head)
+    wb = document_to_workbook(doc, base_url=base_url, streaming=streaming, incremental=incremental, stats=stats,
+                              template=template, max_rows=max_rows, repeat_head=repeat_head,
+                              named_styles=named_styles)
+    if optimize:
+        _optimize(wb, stats)
+    _save(lambda output: save_workbook(wb, output, compresslevel=compresslevel), filename, stats)
+
+
+def tables_to_xl(tables, filename, streaming=False, stats=None, observer=None, compresslevel=None, max_rows=None,
+                 repeat_head=False, named_styles=False, optimize=False):
+    """
+    Write tables built without markup to an xlsx file, at a path or to a binary file-like object
+    given as filename.
+    """
+    if optimize and streaming:
+        raise ValueError('optimize needs the whole workbook, it is not available with streaming')
+    if stats is None and observer is not None:
+        stats = ConversionStats(observer)
+    wb = tables_to_workbook(tables, streaming=streaming, stats=stats, max_rows=max_rows, repeat_head=repeat_head,
+                            named_styles=named_styles)
+    if optimize:
+        _optimize(wb, stats)
+    _save(lambda output: save_workbook(wb, output, compresslevel=compresslevel), filename, stats)
+
+
+def _document_to_xl_fast(doc, output, base_url, incremental, stats, compresslevel, template, max_rows=None,
+                         repeat_head=False):
+    split = max_rows is not None or repeat_head
+    tables = layouts = None
+    values = ValueInterner()
+    if template is not None and not incremental:
+        with stage(stats, 'parse'):
+            tables = template.render(doc, values)
+    if tables is None:
+        doc = inline_external_stylesheets(doc, base_url, stats)
+        if incremental:
+            with stage(stats, 'parse'):
+                # Measured on a first parse, written while the document is parsed again. Split
+                # tables are measured one sheet at a time instead.
+                if not split:
+                    layouts = measure_tables(iter_tables(doc))
+                tables = iter_tables(doc, values)
+        else:
+            tables = get_tables(doc, values, stats)
+
+    def save(output):
+        # Serializing the sheets is the save, nothing is written before
+        with FastWorkbookWriter(output, compresslevel=compresslevel, stats=stats) as writer:
+            if not split:
+                writer.add_sheet(tables, layouts)
+                return
+            for page in paginate(tables, max_rows, repeat_head):
+                writer.add_sheet(page)
+    _save(save, output, stats)
+    if stats is not None:
+        stats.count_values(values)
+
+
+def document_to_bytes(doc, **kwargs):
+    """
+    The xlsx file of a document, the keyword arguments are the options of document_to_xl.
+    """
+    output = BytesIO()
+    document_to_xl(doc, output, **kwargs)
+    return output.getvalue()
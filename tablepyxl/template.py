@@ -0,0 +1,113 @@
+"""
+Documents rendered from the same html template with different data share their structure: the
+tables, rows and cells, their attributes and the stylesheet. A Template is compiled from one such
+document. Documents with the same structure are then converted by extracting only the cell
+values, the styles, spans and number formats of the compiled tables are reused as they are.
+"""
+import copy
+import hashlib
+
+from lxml import etree
+
+from tablepyxl.css import document_stylesheet, has_external_stylesheet
+from tablepyxl.style import Table
+from tablepyxl.tablepyxl import parse_document
+
+CELL_TAGS = ('td', 'th')
+# document_to_xl turns <br> into newlines and drops the newlines of the markup, a template compiled
+# from the document as given has to match the document as it is converted
+IGNORED_TAGS = ('br',)
+
+
+def structure_hash(tree):
+    """
+    A digest of the markup of a parsed document without its text. The contents of cells are values,
+    they are not part of the structure.
+    """
+    parts = []
+    walker = etree.iterwalk(tree, events=('start', 'end'))
+    for event, element in walker:
+        tag = element.tag
+        if not isinstance(tag, str) or tag in IGNORED_TAGS:
+            continue
+        if event == 'end':
+            parts.append('/')
+            continue
+        parts.append(tag)
+        parts.append(repr(element.attrib.items()))
+        if tag in CELL_TAGS:
+            walker.skip_subtree()
+        elif tag == 'style':
+            parts.append((element.text or '').replace('\n', ''))
+    return hashlib.blake2b('\0'.join(parts).encode('utf-8'), digest_size=16).hexdigest()
+
+
+def table_elements(tree):
+    return tree.xpath('//table[not(ancestor::table)]')
+
+
+def cell_elements(tr):
+    # In the order TableRow builds its cells in
+    return tr.findall('th') + tr.findall('td')
+
+
+class Template(object):
+    """
+    A document compiled for converting documents with the same structure. Pass it as the template
+    argument of document_to_workbook or document_to_xl, a document that doesn't match is converted
+    as usual.
+
+    Documents with linked stylesheets are never matched, the styles Premailer inlines are not
+    known until the stylesheet is fetched.
+    """
+
+    def __init__(self, doc):
+        if has_external_stylesheet(doc):
+            self.key = None
+            self.tables = []
+            return
+        tree = parse_document(doc)
+        self.key = structure_hash(tree)
+        stylesheet = document_stylesheet(tree)
+        self.tables = [Table(table, stylesheet=stylesheet) for table in table_elements(tree)]
+
+    def matches(self, tree):
+        return self.key is not None and structure_hash(tree) == self.key
+
+    def render(self, doc, values=None):
+        """
+        The tables of a document built from the compiled ones, or None when its structure is not
+        the structure of the template. See get_tables for values.
+        """
+        if self.key is None:
+            return None
+        tree = parse_document(doc)
+        if not self.matches(tree):
+            return None
+        stylesheet = document_stylesheet(tree)
+        return [self._fill(table, element, stylesheet, values)
+                for table, element in zip(self.tables, table_elements(tree))]
+
+    @staticmethod
+    def _fill_rows(section, element, stylesheet, values):
+        rows = []
+        for row, tr in zip(section.rows, element.findall('tr')):
+            filled_row = copy.copy(row)
+            filled_row.cells = [cell.refill(td, stylesheet, values) for cell, td in zip(row.cells, cell_elements(tr))]
+            rows.append(filled_row)
+        filled = copy.copy(section)
+        filled.rows = rows
+        return filled
+
+    @classmethod
+    def _fill(cls, table, element, stylesheet, values=None):
+        body_element = element.find('tbody')
+        if body_element is None:
+            body_element = element
+
+        filled = copy.copy(table)
+        filled.body = cls._fill_rows(table.body, body_element, stylesheet, values)
+        if table.head is not None:
+            # The head is written by repeat_head on every sheet a split table is on
+            filled.head = cls._fill_rows(table.head, element.find('thead'), stylesheet, values)
+        return filled
@@ -0,0 +1,115 @@
+import functools
+import re
+from datetime import datetime
+from decimal import Decimal
+
+CURRENCY_SYMBOLS = '$\u20ac\u00a3\u00a5\u20b9'
+# Characters used to group thousands, besides the comma and the period
+GROUP_SEPARATORS = (' ', "'", '\u00a0', '\u202f')
+DATE_FORMATS = ('%m/%d/%Y', '%m/%d/%y', '%Y-%m-%d', '%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S', '%d.%m.%Y',
+                '%B %d, %Y', '%b %d, %Y', '%d %B %Y', '%d %b %Y')
+
+# Only the separator layouts below are read as numbers, anything else is left as text
+NUMBER_RE = re.compile(r'^(\d+|\d{1,3}(,\d{3})+|\d{1,3}(\.\d{3})+)?([.,]\d+)?$')
+THOUSANDS_RE = re.compile(r'^\d{1,3}([.,])\d{3}$')
+
+
+def parse_decimal(text):
+    """
+    Read a number written with thousands separators, currency symbols or a decimal comma,
+    e.g. ``$1,234.50``, ``1.234,5``, ``1 234`` or ``(12)``. Returns None if the text is not a number.
+    """
+    text = text.strip()
+    negative = text.startswith('(') and text.endswith(')')
+    if negative:
+        text = text[1:-1]
+    text = text.strip(CURRENCY_SYMBOLS + ' ')
+    if text[:1] in ('+', '-'):
+        negative = negative != (text[0] == '-')
+        text = text[1:].strip(CURRENCY_SYMBOLS + ' ')
+    for separator in GROUP_SEPARATORS:
+        text = text.replace(separator, '')
+    if not text or not NUMBER_RE.match(text):
+        return None
+
+    comma, period = text.rfind(','), text.rfind('.')
+    if comma > period:
+        # 1.234,5 and 1,5 have a decimal comma, 1,234 and 1,234,567 only group thousands
+        grouped = period == -1 and (text.count(',') > 1 or THOUSANDS_RE.match(text))
+        decimal_mark = '.' if grouped else ','
+    elif period > comma:
+        decimal_mark = ',' if comma == -1 and text.count('.') > 1 else '.'
+    else:
+        decimal_mark = '.'
+    group_mark = ',' if decimal_mark == '.' else '.'
+    if text.count(decimal_mark) > 1:
+        return None
+
+    number = Decimal(text.replace(group_mark, '').replace(decimal_mark, '.'))
+    return -number if negative else number
+
+
+def to_number(text):
+    number = parse_decimal(text)
+    if number is None:
+        return None
+    if number == number.to_integral_value():
+        return int(number)
+    return float(number)
+
+
+def to_currency(text):
+    # Money stays exact
+    return parse_decimal(text)
+
+
+def to_percentage(text):
+    # 25% is read as 0.25, a bare number is already the fraction
+    percent = '%' in text
+    number = parse_decimal(text.replace('%', '') if percent else text)
+    if number is None:
+        return None
+    return float(number / 100 if percent else number)
+
+
+def to_date(text):
+    text = ' '.join(text.split())
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, date_format)
+        except ValueError:
+            continue
+    return None
+
+
+CONVERTERS = (
+    ('TYPE_CURRENCY', to_currency),
+    ('TYPE_INTEGER', to_number),
+    ('TYPE_PERCENTAGE', to_percentage),
+    ('TYPE_DATE', to_date),
+    ('TYPE_NUMERIC', to_number),
+)
+
+
+@functools.lru_cache(maxsize=256)
+def converter_for(classes):
+    """
+    The converter for the cells of a class attribute, or None when their text is kept as is.
+    A column tags all of its cells alike, so this is decided once per column.
+    """
+    classes = set(classes.split())
+    if 'TYPE_FORMULA' in classes:
+        return None
+    for cell_type, converter in CONVERTERS:
+        if cell_type in classes:
+            return converter
+    return None
+
+
+@functools.lru_cache(maxsize=4096)
+def convert(text, converter):
+    """
+    The typed value of a cell's text, or None if it can't be converted. Reports repeat the
+    same values a lot, so conversions are cached.
+    """
+    return converter(text)
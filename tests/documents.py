@@ -0,0 +1,108 @@
+"""
+Documents shared by the tests, and what a reader of the xlsx files written from them sees.
+"""
+from io import BytesIO
+
+from openpyxl import load_workbook
+
+from tablepyxl.tablepyxl import document_to_xl
+
+DEFAULT_ROW_HEIGHT = 15
+
+DOCUMENTS = {
+    'basic': """<html><body><table name="t1" border="1" style="border: 2px solid #ff0000">
+        <thead><tr><th>H1</th><th>H2</th></tr></thead>
+        <tbody><tr><td>Cell contents 1</td><td style="font-weight: bold; color: #00ff00">Cell contents 2</td></tr>
+        <tr><td bgcolor="yellow" align="center">x<br>y<br />z</td>
+        <td style="border-top: 3px dashed blue; background: #abc">a long value here</td></tr>
+        </tbody></table></body></html>""",
+    'stylesheet': """<html><head><style>
+        .hdr { font-weight: bold; background-color: #cccccc; text-align: center }
+        td.num { text-align: right; color: navy }
+        #special { font-style: italic }
+        table.grid td { border: 1px solid black }
+        </style></head><body>
+        <table class="grid"><tr><td class="hdr">Name</td><td class="hdr">Value</td></tr>
+        <tr><td id="special">alpha</td><td class="num">1,234.5</td></tr>
+        <tr><td>beta</td><td class="num TYPE_INTEGER">42</td></tr>
+        <tr><td>gamma</td><td class="TYPE_CURRENCY">12.50</td></tr>
+        <tr><td>delta</td><td class="TYPE_PERCENTAGE">0.25</td></tr>
+        <tr><td>eta</td><td class="TYPE_DATE">01/02/2020</td></tr>
+        </table></body></html>""",
+    'spans': """<table style="border: 1px solid black; border-bottom-width: 2px">
+        <tr><td rowspan="2">A</td><td colspan="2">B</td><td>C</td></tr>
+        <tr><td>D</td><td rowspan="2" colspan="2">E</td></tr>
+        <tr><td>F</td><td>G</td></tr>
+        <tr><td colspan="4">H</td></tr>
+        </table>""",
+    'framed': """<table style="border-top-style: solid; border-top-width: 2px; border-top-color: #ff0000;
+        border-left-style: dashed; border-left-color: #0000ff">
+        <tr><td style="border-top-style: dotted">a</td><td rowspan="3">c</td></tr>
+        <tr><td style="border-left-style: double; border-top-style: dotted">d</td></tr>
+        </table>""",
+    'rich': """<table><tr><td>plain <b>bold <font color="red">red bold</font></b> tail</td>
+        <td><font color="#00f" size="14">blue <b>both</b></font> after</td><td>Tabs</td></tr></table>""",
+    'tables': """<table name="one"><tr><td>1</td></tr></table><p>x</p>
+        <table name="two"><tr><td>2</td><td>3</td></tr><tr><td><table><tr><td>nested</td></tr></table></td></tr>
+        </table>""",
+    'types': """<table><tr><td class="TYPE_NUMERIC">12</td><td class="TYPE_NUMERIC">1,234.5</td>
+        <td class="TYPE_FORMULA">=A1+B1</td><td class="TYPE_BOOL">1</td><td class="TYPE_ERROR">#N/A</td>
+        <td>x &amp; y &lt;z&gt; &quot;q&quot;</td><td>caf&eacute; &#8364;</td><td class="TYPE_NUMERIC">many</td></tr>
+        </table>""",
+    'repeated': '<table>{}</table>'.format(''.join(
+        '<tr><td>Region {}</td><td><b>Total</b> due</td><td>{}</td><td style="color: red">Open</td></tr>'.format(
+            i % 3, i % 4) for i in range(40))),
+    'sparse': """<table style="border: 1px solid black">{}</table>""".format(''.join(
+        '<tr><td>{}</td><td></td><td style="background-color: #ffff00"></td><td></td></tr>'.format(i)
+        for i in range(10))),
+}
+
+
+def xlsx(doc, **options):
+    """
+    The xlsx file document_to_xl writes for a document.
+    """
+    output = BytesIO()
+    document_to_xl(doc, output, **options)
+    return output.getvalue()
+
+
+def _side(side):
+    return (side.style, side.color.rgb if side.color is not None else None) if side is not None and side.style else None
+
+
+def read_sheets(data):
+    """
+    What each sheet of an xlsx file shows: its title, merged ranges, column widths, row heights and,
+    for every cell with a value or a visible fill or border, the value and how it is drawn.
+    """
+    wb = load_workbook(BytesIO(data), rich_text=True)
+    sheets = []
+    for ws in wb.worksheets:
+        cells = {}
+        for row in ws.iter_rows():
+            for cell in row:
+                fill = cell.fill.fgColor.rgb if cell.fill.fill_type else None
+                borders = [_side(cell.border.left), _side(cell.border.right), _side(cell.border.top),
+                           _side(cell.border.bottom)]
+                if cell.value is None:
+                    if fill is not None or any(borders):
+                        cells[cell.coordinate] = [None, fill, borders]
+                    continue
+                font = cell.font
+                cells[cell.coordinate] = [
+                    repr(cell.value), cell.data_type, cell.number_format,
+                    [font.b, font.i, font.color.rgb if font.color is not None else None, font.sz],
+                    fill, borders,
+                    [cell.alignment.horizontal, cell.alignment.vertical, cell.alignment.wrap_text],
+                ]
+        sheets.append({
+            'title': ws.title,
+            'merges': sorted(str(merged) for merged in ws.merged_cells.ranges),
+            'widths': {key: dimension.width for key, dimension in ws.column_dimensions.items() if dimension.width},
+            # Rows of the default height look the same whether or not it is set
+            'heights': {key: dimension.height for key, dimension in ws.row_dimensions.items()
+                        if dimension.height and dimension.height != DEFAULT_ROW_HEIGHT},
+            'cells': cells,
+        })
+    return sheets
@@ -0,0 +1,85 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from documents import DOCUMENTS, read_sheets, xlsx
+from tablepyxl import aio
+from tablepyxl.aio import AsyncConverter, document_to_workbook_async, document_to_xl_async
+
+
+class Writer(object):
+    def __init__(self):
+        self.chunks = []
+
+    async def write(self, data):
+        self.chunks.append(bytes(data))
+
+
+class StreamWriter(Writer):
+    def write(self, data):
+        self.chunks.append(bytes(data))
+
+    async def drain(self):
+        self.chunks.append(b'')
+
+
+def test_bytes_are_the_same():
+    data = asyncio.run(AsyncConverter().document_to_bytes(DOCUMENTS['spans'], streaming=True))
+    assert read_sheets(data) == read_sheets(xlsx(DOCUMENTS['spans'], streaming=True))
+
+
+def test_workbook():
+    wb = asyncio.run(document_to_workbook_async(DOCUMENTS['basic'], streaming=True))
+    assert wb.write_only
+    output = BytesIO()
+    wb.save(output)
+    assert read_sheets(output.getvalue())[0]['cells']
+
+
+def test_writes_to_a_path(tmp_path):
+    filename = str(tmp_path / 'basic.xlsx')
+    asyncio.run(document_to_xl_async(DOCUMENTS['basic'], filename))
+    with open(filename, 'rb') as f:
+        assert read_sheets(f.read()) == read_sheets(xlsx(DOCUMENTS['basic']))
+
+
+def test_writes_in_chunks():
+    converter = AsyncConverter(chunk_size=1000)
+    for writer in [Writer(), StreamWriter()]:
+        asyncio.run(converter.document_to_xl(DOCUMENTS['basic'], writer))
+        chunks = [chunk for chunk in writer.chunks if chunk]
+        assert max(len(chunk) for chunk in chunks) == 1000
+        assert read_sheets(b''.join(chunks)) == read_sheets(xlsx(DOCUMENTS['basic']))
+    # Each chunk is drained before the next one is written
+    assert writer.chunks[1::2] == [b''] * len(chunks)
+
+
+def test_concurrency_is_limited(monkeypatch):
+    lock = threading.Lock()
+    running = [0, 0]
+
+    def convert(doc, **options):
+        with lock:
+            running[0] += 1
+            running[1] = max(running)
+        time.sleep(0.02)
+        with lock:
+            running[0] -= 1
+        return b''
+
+    monkeypatch.setattr(aio, 'document_to_bytes', convert)
+    converter = AsyncConverter(executor=ThreadPoolExecutor(8), max_concurrency=2)
+
+    async def convert_all():
+        await asyncio.gather(*[converter.document_to_bytes(DOCUMENTS['basic']) for _ in range(6)])
+
+    asyncio.run(convert_all())
+    assert running[1] == 2
+
+
+def test_options_are_passed_on():
+    converter = AsyncConverter()
+    data = asyncio.run(converter.document_to_bytes(DOCUMENTS['repeated'], engine='fast', max_rows=15))
+    assert read_sheets(data) == read_sheets(xlsx(DOCUMENTS['repeated'], engine='fast', max_rows=15))
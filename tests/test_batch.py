@@ -0,0 +1,60 @@
+import pytest
+
+from documents import DOCUMENTS, read_sheets, xlsx
+from tablepyxl.batch import documents_to_xl
+
+
+def batch(tmp_path):
+    items = [(DOCUMENTS[name], str(tmp_path / '{}.xlsx'.format(name))) for name in sorted(DOCUMENTS)]
+    # Saving into a missing directory fails
+    items.insert(2, (DOCUMENTS['basic'], str(tmp_path / 'missing' / 'basic.xlsx')))
+    return items
+
+
+@pytest.mark.parametrize('workers', [0, 2])
+def test_converts_every_document(tmp_path, workers):
+    items = batch(tmp_path)
+    results = list(documents_to_xl(items, workers=workers, chunksize=2))
+    assert [(result.index, result.filename) for result in results] == [
+        (index, filename) for index, (_, filename) in enumerate(items)]
+    for result, (doc, filename) in zip(results, items):
+        if 'missing' in filename:
+            assert 'FileNotFoundError' in result.error
+        else:
+            assert result.error is None
+            with open(filename, 'rb') as f:
+                assert read_sheets(f.read()) == read_sheets(xlsx(doc))
+
+
+def test_unordered_results(tmp_path):
+    items = batch(tmp_path)
+    results = list(documents_to_xl(items, workers=2, ordered=False))
+    assert sorted(result.index for result in results) == list(range(len(items)))
+    assert [result.index for result in results if result.error] == [2]
+
+
+@pytest.mark.parametrize('options', [{'streaming': True}, {'engine': 'fast', 'max_rows': 3}], ids=str)
+def test_options_are_passed_on(tmp_path, options):
+    filename = str(tmp_path / 'spans.xlsx')
+    [result] = documents_to_xl([(DOCUMENTS['spans'], filename)], workers=1, **options)
+    assert result.error is None
+    with open(filename, 'rb') as f:
+        assert read_sheets(f.read()) == read_sheets(xlsx(DOCUMENTS['spans'], **options))
+
+
+@pytest.mark.parametrize('ordered', [True, False])
+def test_items_are_read_as_results_are_taken(tmp_path, ordered):
+    read = []
+
+    def items():
+        for index in range(100):
+            read.append(index)
+            yield DOCUMENTS['basic'], str(tmp_path / '{}.xlsx'.format(index))
+
+    results = documents_to_xl(items(), workers=1, ordered=ordered)
+    next(results)
+    # Two chunks for the one worker and the one submitted when the first was done
+    assert len(read) == 3
+    results.close()
+    assert len(read) == 3
+    assert len(list(tmp_path.iterdir())) <= 3
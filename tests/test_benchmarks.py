@@ -0,0 +1,33 @@
+import pytest
+
+from benchmarks import compression, styles
+from benchmarks.generators import WORKLOADS
+from benchmarks.run import STAGES, benchmark, main, regressions
+
+
+@pytest.mark.parametrize('name', sorted(WORKLOADS))
+def test_workloads_run(name):
+    result = benchmark(WORKLOADS[name](0.01), repeat=1)
+    assert list(result) == list(STAGES) + ['total', 'peak_mb']
+
+
+def test_regressions_above_the_threshold_and_noise():
+    baseline = {'wide': {'parse': 0.1, 'write': 0.001, 'peak_mb': 10}}
+    results = {'wide': {'parse': 0.2, 'write': 0.003, 'peak_mb': 11}, 'spans': {'parse': 1}}
+    assert list(regressions(results, baseline, 0.25)) == [('wide', 'parse', 0.1, 0.2)]
+
+
+def test_saved_baseline_is_compared(tmp_path):
+    baseline = str(tmp_path / 'baseline.json')
+    assert main(['spans', '--scale', '0.01', '--repeat', '1', '--baseline', baseline, '--save']) == 0
+    assert main(['spans', '--scale', '0.01', '--repeat', '1', '--baseline', baseline, '--threshold', '100']) == 0
+
+
+def test_compression_levels(capsys):
+    assert compression.main(['--scale', '0.01', '--repeat', '1']) == 0
+    assert len(capsys.readouterr().out.splitlines()) == 1 + len(compression.LEVELS)
+
+
+def test_style_modes(capsys):
+    assert styles.main(['spans', '--scale', '0.01', '--repeat', '1']) == 0
+    assert 'spans' in capsys.readouterr().out
@@ -0,0 +1,59 @@
+import pytest
+from lxml import html
+from premailer import Premailer
+
+from documents import DOCUMENTS, read_sheets, xlsx
+from tablepyxl import css
+from tablepyxl.css import Stylesheet, compile_stylesheet, split_rules
+
+CASCADE = """<html><head><style>
+/* comment */
+@media print { td { color: #ff0000 } }
+td { color: #0000ff; font-size: 10px }
+.a { color: #008000 !important }
+#x { color: #800080; background-color: #eeeeee }
+table > tr > td.b { font-weight: bold }
+table td.b { font-style: italic }
+div td { color: #000000 }
+tr td:first-child { text-align: right }
+td[data-k=v] { vertical-align: bottom }
+td:hover { color: #ffc0cb }
+* { font-family: Arial }
+tr.odd { background-color: #dddddd }
+</style></head><body><table><tr class="odd"><td class="a">1</td><td id="x" class="b">2</td>
+<td style="color: #ffa500" class="a">3</td><td data-k="v">4</td></tr>
+<tr><td class="b a">5</td><td style="color: #ffa500" class="a">6</td></tr></table></body></html>"""
+
+
+@pytest.mark.parametrize('name', ['cascade', 'stylesheet', 'basic'])
+def test_matches_premailer(name):
+    doc = CASCADE if name == 'cascade' else DOCUMENTS[name]
+    inlined = Premailer(doc, remove_classes=False).transform()
+    assert read_sheets(xlsx(doc)) == read_sheets(xlsx(inlined))
+
+
+def test_split_rules_skips_at_rules():
+    css_text = '@import "x.css"; @media print { td { color: red } } /* td { x: y } */ td { color: blue }'
+    rules = list(split_rules(css_text))
+    assert rules == [('td', ' color: blue ')]
+
+
+def test_compiled_once():
+    assert compile_stylesheet('td { color: red }') is compile_stylesheet('td { color: red }')
+
+
+def test_declarations_cache_ignores_ids_without_id_rules():
+    stylesheet = Stylesheet('td { color: red }')
+    for index in range(100):
+        element = html.fragment_fromstring('<td id="r{}">x</td>'.format(index), create_parent='tr')[0]
+        assert stylesheet.declarations(element) == {'color': 'red'}
+    assert len(stylesheet._cache) == 1
+
+
+def test_declarations_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(css, 'DECLARATIONS_CACHE_SIZE', 10)
+    stylesheet = Stylesheet('#r1 { color: red }')
+    for index in range(100):
+        element = html.fragment_fromstring('<td id="r{}">x</td>'.format(index), create_parent='tr')[0]
+        assert stylesheet.declarations(element) == ({'color': 'red'} if index == 1 else {})
+    assert len(stylesheet._cache) == 10
@@ -0,0 +1,84 @@
+from io import BytesIO
+from zipfile import ZipFile
+
+import pytest
+from openpyxl import load_workbook
+from openpyxl.cell.rich_text import CellRichText, TextBlock
+from openpyxl.cell.text import InlineFont
+
+from documents import DOCUMENTS, read_sheets, xlsx
+from tablepyxl.fastwriter import SharedStrings, cell_xml
+from tablepyxl.stats import ConversionStats
+from tablepyxl.tablepyxl import document_to_bytes
+from tablepyxl.template import Template
+
+
+@pytest.mark.parametrize('name', sorted(DOCUMENTS))
+def test_matches_openpyxl(name):
+    doc = DOCUMENTS[name]
+    assert read_sheets(xlsx(doc, engine='fast')) == read_sheets(xlsx(doc))
+
+
+@pytest.mark.parametrize('options', [
+    {'incremental': True},
+    {'max_rows': 3},
+    {'max_rows': 5, 'repeat_head': True},
+    {'compresslevel': 0},
+], ids=str)
+@pytest.mark.parametrize('name', ['basic', 'spans', 'repeated'])
+def test_matches_openpyxl_with_options(name, options):
+    doc = DOCUMENTS[name]
+    assert read_sheets(xlsx(doc, engine='fast', **options)) == read_sheets(xlsx(doc, **options))
+
+
+def test_matches_openpyxl_with_template():
+    template = Template(DOCUMENTS['repeated'])
+    doc = DOCUMENTS['repeated'].replace('Open', 'Closed')
+    assert read_sheets(xlsx(doc, engine='fast', template=template)) == read_sheets(xlsx(doc))
+
+
+def test_parts_are_valid():
+    data = xlsx(DOCUMENTS['tables'], engine='fast')
+    names = ZipFile(BytesIO(data)).namelist()
+    assert {'[Content_Types].xml', '_rels/.rels', 'xl/workbook.xml', 'xl/styles.xml', 'xl/sharedStrings.xml',
+            'xl/worksheets/sheet1.xml'} <= set(names)
+    wb = load_workbook(BytesIO(data))
+    assert [ws.max_row for ws in wb.worksheets] == [4]
+
+
+def test_stats():
+    stats = ConversionStats()
+    data = document_to_bytes(DOCUMENTS['spans'], engine='fast', stats=stats)
+    assert stats.bytes_written == len(data)
+    assert (stats.tables, stats.rows, stats.cells, stats.merges) == (1, 4, 8, 4)
+    assert {'parse', 'save'} <= set(stats.timings)
+
+
+def test_unknown_engine():
+    with pytest.raises(ValueError):
+        document_to_bytes(DOCUMENTS['basic'], engine='unknown')
+
+
+def test_shared_strings_are_added_once():
+    strings = SharedStrings()
+    rich = CellRichText([TextBlock(InlineFont(b=True), 'a'), 'b'])
+    same = CellRichText(list(rich))
+    indexes = [strings.add(value) for value in ('a', 'b', 'a', rich, rich, same)]
+    assert indexes == [0, 1, 0, 2, 2, 2]
+    assert strings.references == 6
+    assert len(strings.items) == 3
+
+
+@pytest.mark.parametrize('value, data_type, expected', [
+    (1.5, None, '<c r="A1" s="0" t="n"><v>1.5</v></c>'),
+    (True, None, '<c r="A1" s="0" t="b"><v>1</v></c>'),
+    ('=A2', None, '<c r="A1" s="0"><f>A2</f><v/></c>'),
+    ('#N/A', None, '<c r="A1" s="0" t="e"><v>#N/A</v></c>'),
+    ('12', 's', '<c r="A1" s="0" t="s"><v>0</v></c>'),
+    (None, None, '<c r="A1" s="0"/>'),
+    ('', None, '<c r="A1" s="0"/>'),
+    ('', 's', '<c r="A1" s="0"/>'),
+    ('', 'n', '<c r="A1" s="0"/>'),
+])
+def test_cell_xml(value, data_type, expected):
+    assert cell_xml('A1', 0, value, data_type, SharedStrings()) == expected
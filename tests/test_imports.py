@@ -0,0 +1,34 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from documents import DOCUMENTS
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONVERT = """
+import sys
+from tablepyxl.tablepyxl import document_to_workbook
+try:
+    document_to_workbook(sys.argv[1])
+except Exception as e:
+    print(type(e).__name__)
+print(sorted(name for name in ('premailer', 'numpy') if name in sys.modules))
+"""
+
+
+def imported(doc):
+    return subprocess.run([sys.executable, '-c', CONVERT, doc], cwd=ROOT, check=True, stdout=subprocess.PIPE,
+                          universal_newlines=True).stdout.split('\n')[:-1]
+
+
+@pytest.mark.parametrize('name', ['basic', 'stylesheet'])
+def test_premailer_is_not_imported_without_links(name):
+    assert imported(DOCUMENTS[name]) == ['[]']
+
+
+def test_premailer_inlines_linked_stylesheets():
+    # Premailer refuses to load a local file, which shows it is the one reading the link
+    doc = '<link rel="stylesheet" href="style.css">' + DOCUMENTS['basic']
+    assert imported(doc) == ['ExternalFileLoadingError', "['premailer']"]
@@ -0,0 +1,51 @@
+import pytest
+
+from documents import DOCUMENTS, read_sheets, xlsx
+from tablepyxl.incremental import iter_tables
+from tablepyxl.style import resolve_style
+from tablepyxl.tablepyxl import get_tables
+
+
+def contents(tables):
+    result = []
+    for table in tables:
+        rows = []
+        for row in table.body.rows:
+            rows.append([(repr(cell.value), cell.rowspan, cell.colspan, resolve_style(cell.style_dict),
+                          cell.number_format) for cell in row.cells])
+        head = [[repr(cell.value) for cell in row.cells] for row in table.head.rows] if table.head else None
+        result.append((resolve_style(table.style_dict), head, rows))
+    return result
+
+
+@pytest.mark.parametrize('name', sorted(DOCUMENTS))
+def test_matches_get_tables(name):
+    doc = DOCUMENTS[name]
+    assert contents(iter_tables(doc)) == contents(get_tables(doc))
+
+
+def test_tables_are_parsed_as_they_are_requested():
+    doc = DOCUMENTS['tables']
+    tables = iter_tables(doc)
+    first = next(tables)
+    # Its rows are parsed as they are iterated, before the next table is
+    assert contents([first]) == contents(get_tables(doc)[:1])
+    assert len(list(tables)) == 1
+
+
+def test_style_blocks_apply_to_the_tables_after_them():
+    doc = ('<table><tr><td class="x">1</td></tr></table><style>.x { font-weight: bold }</style>'
+           '<table><tr><td class="x">2</td></tr></table>')
+    first, second = [next(iter(table.body.rows)).cells[0] for table in iter_tables(doc)]
+    assert not resolve_style(first.style_dict)[0][2]
+    assert resolve_style(second.style_dict)[0][2]
+
+
+@pytest.mark.parametrize('options', [
+    {'incremental': True},
+    {'streaming': True, 'incremental': True},
+], ids=str)
+@pytest.mark.parametrize('name', sorted(DOCUMENTS))
+def test_writes_the_same(name, options):
+    doc = DOCUMENTS[name]
+    assert read_sheets(xlsx(doc, **options)) == read_sheets(xlsx(doc))
@@ -0,0 +1,114 @@
+import random
+from array import array
+from io import BytesIO
+
+import pytest
+from openpyxl import load_workbook
+
+from documents import DOCUMENTS, read_sheets, xlsx
+from tablepyxl import layout
+from tablepyxl.layout import Autosizer, paginate, split_table
+from tablepyxl.tablepyxl import get_tables
+from tablepyxl.template import Template
+
+ENGINES = ['openpyxl', 'fast']
+HEADED = '<table><thead><tr><th>Name</th><th>Count</th></tr></thead><tbody>{}</tbody></table>'.format(''.join(
+    '<tr><td>row {}</td><td>{}</td></tr>'.format(i, i) for i in range(10)))
+
+
+def sheet_values(data):
+    return [[[cell.value for cell in row] for row in ws.iter_rows()] for ws in load_workbook(BytesIO(data)).worksheets]
+
+
+def measurements(count):
+    numbers = random.Random(0)
+    keys = array('l', [numbers.randrange(1, 100) for _ in range(count)])
+    return keys, array('l', [numbers.randrange(1, 500) for _ in range(count)])
+
+
+def test_reduce_keeps_the_largest_value():
+    assert Autosizer._reduce(array('l', [3, 1, 3, 2]), array('l', [5, 7, 9, 1])) == {3: 9, 1: 7, 2: 1}
+
+
+def test_numpy_reduces_the_same(monkeypatch):
+    pytest.importorskip('numpy')
+    keys, values = measurements(1000)
+    monkeypatch.setattr(layout, 'VECTORIZE_THRESHOLD', 0)
+    vectorized = Autosizer._reduce(keys, values)
+    monkeypatch.setattr(layout, '_numpy', lambda: None)
+    assert vectorized == Autosizer._reduce(keys, values)
+
+
+@pytest.mark.parametrize('streaming', [False, True])
+def test_sizes_fit_the_text(streaming):
+    doc = ('<table><tr><td>{}</td><td style="font-size: 22px">x</td><td>short</td></tr>'
+           '<tr><td>two<br>lines</td></tr></table>').format('w' * 30)
+    sheet = read_sheets(xlsx(doc, streaming=streaming))[0]
+    assert sheet['widths']['A'] == 33
+    assert sheet['widths']['B'] == layout.DEFAULT_COLUMN_WIDTH
+    assert sheet['heights'] == {1: 30, 2: 30}
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_sheets_have_at_most_max_rows(engine):
+    sheets = sheet_values(xlsx(DOCUMENTS['repeated'], engine=engine, max_rows=15))
+    assert [len(rows) for rows in sheets] == [15, 15, 10]
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_head_is_repeated(engine):
+    sheets = sheet_values(xlsx(HEADED, engine=engine, max_rows=4, repeat_head=True))
+    assert len(sheets) == 4
+    assert all(rows[0] == ['Name', 'Count'] for rows in sheets)
+    assert [row[0] for rows in sheets for row in rows[1:]] == ['row {}'.format(i) for i in range(10)]
+
+
+def test_rowspans_are_kept_together():
+    table = get_tables(DOCUMENTS['spans'])[0]
+    # A and E chain the first three rows
+    assert [height for _, height in split_table(table, 3)] == [3, 1]
+
+
+def test_rowspans_longer_than_a_sheet():
+    table = get_tables(DOCUMENTS['spans'])[0]
+    with pytest.raises(ValueError):
+        list(split_table(table, 2))
+
+
+@pytest.mark.parametrize('max_rows', [0, 2 ** 20 + 1])
+def test_max_rows_out_of_range(max_rows):
+    with pytest.raises(ValueError):
+        list(paginate(get_tables(DOCUMENTS['basic']), max_rows))
+
+
+@pytest.mark.parametrize('options', [
+    {},
+    {'streaming': True},
+    {'streaming': True, 'incremental': True},
+    {'engine': 'fast'},
+    {'max_rows': 10},
+], ids=str)
+def test_tables_wider_than_a_sheet(options):
+    with pytest.raises(ValueError, match='16385 columns wide'):
+        xlsx('<table><tr><td colspan="16384">a</td><td>c</td></tr></table>', **options)
+
+
+@pytest.mark.parametrize('options', [
+    {'max_rows': 5},
+    {'repeat_head': True},
+    {'max_rows': 5, 'streaming': True},
+], ids=str)
+@pytest.mark.parametrize('engine', ENGINES)
+def test_document_without_tables(engine, options):
+    if engine == 'fast' and 'streaming' in options:
+        pytest.skip('the fast engine always streams')
+    assert sheet_values(xlsx('<p>no tables</p>', engine=engine, **options)) == [[]]
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_template_head_is_refilled(engine):
+    template = Template(HEADED)
+    doc = HEADED.replace('Count', 'Total')
+    sheets = sheet_values(xlsx(doc, engine=engine, max_rows=4, repeat_head=True, template=template))
+    assert all(rows[0] == ['Name', 'Total'] for rows in sheets)
+    assert sheets == sheet_values(xlsx(doc, engine=engine, max_rows=4, repeat_head=True))
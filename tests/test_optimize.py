@@ -0,0 +1,95 @@
+from io import BytesIO
+
+import pytest
+from openpyxl import Workbook, load_workbook
+from openpyxl.styles import Border, Font, PatternFill, Side
+
+from documents import DOCUMENTS, read_sheets, xlsx
+from tablepyxl.optimize import optimize_workbook
+from tablepyxl.stats import ConversionStats
+from tablepyxl.style import StyleRegistry
+from tablepyxl.tablepyxl import document_to_workbook, new_workbook, save_workbook
+
+
+def saved(wb):
+    output = BytesIO()
+    save_workbook(wb, output)
+    return output.getvalue()
+
+
+@pytest.mark.parametrize('name', sorted(DOCUMENTS))
+def test_looks_the_same(name):
+    doc = DOCUMENTS[name]
+    stats = ConversionStats()
+    optimized = xlsx(doc, optimize=True, stats=stats)
+    assert read_sheets(optimized) == read_sheets(xlsx(doc))
+    assert stats.optimization is not None
+    assert 'optimize' in stats.timings
+
+
+def test_drops_empty_cells():
+    wb = document_to_workbook(DOCUMENTS['sparse'])
+    before = len(wb.active._cells)
+    data = saved(wb)
+    report = optimize_workbook(wb)
+    assert report.empty_cells > 0
+    assert len(wb.active._cells) == before - report.empty_cells
+    optimized = saved(wb)
+    assert len(optimized) < len(data)
+    assert read_sheets(optimized) == read_sheets(data)
+
+
+def test_hoists_column_defaults():
+    doc = '<table>{}</table>'.format(''.join(
+        '<tr><td>{}</td><td style="text-align: right"></td></tr>'.format(i) for i in range(20)))
+    wb = document_to_workbook(doc)
+    report = optimize_workbook(wb)
+    assert report.column_defaults == 1
+    ws = load_workbook(BytesIO(saved(wb))).active
+    assert ws.column_dimensions['B'].alignment.horizontal == 'right'
+    assert ws['B1'].value is None
+
+
+def test_merges_records_drawn_the_same():
+    wb = Workbook()
+    ws = wb.active
+    for row in range(1, 100):
+        # Sides without a style and the background of solid fills aren't drawn
+        ws.cell(row, 1, row).border = Border(left=Side(color='FF{:06X}'.format(row)))
+        ws.cell(row, 2, row).fill = PatternFill('solid', fgColor='FFEEEEEE', bgColor='FF{:06X}'.format(row))
+        ws.cell(row, 3, row).font = Font(bold=True)
+    data = saved(wb)
+    report = optimize_workbook(wb)
+    assert report.records['borders'] == (100, 1)
+    assert report.records['fills'] == (101, 3)
+    assert report.cell_styles[1] < report.cell_styles[0]
+    assert read_sheets(saved(wb)) == read_sheets(data)
+
+
+def test_can_write_after_optimizing():
+    wb = document_to_workbook('<table><tr><td style="font-weight: bold">a</td></tr></table>')
+    optimize_workbook(wb)
+    document_to_workbook('<table><tr><td style="font-weight: bold">x</td><td style="color: #ff0000">c</td></tr>'
+                         '</table>', wb=wb)
+    cells = [cell for ws in load_workbook(BytesIO(saved(wb))).worksheets for row in ws.iter_rows() for cell in row
+             if cell.value is not None]
+    assert [(cell.value, cell.font.b, cell.font.color.rgb if cell.font.color else None) for cell in cells] == [
+        ('a', True, None), ('x', True, None), ('c', False, '00ff0000')]
+
+
+def test_no_registry_is_created():
+    wb = Workbook()
+    wb.active['A1'] = 'a'
+    optimize_workbook(wb)
+    assert StyleRegistry.registered(wb) is None
+
+
+def test_write_only_workbooks_are_refused():
+    with pytest.raises(ValueError):
+        optimize_workbook(new_workbook(streaming=True))
+
+
+@pytest.mark.parametrize('options', [{'streaming': True}, {'engine': 'fast'}], ids=str)
+def test_needs_the_whole_workbook(options):
+    with pytest.raises(ValueError):
+        xlsx(DOCUMENTS['basic'], optimize=True, **options)
@@ -0,0 +1,63 @@
+import datetime
+from decimal import Decimal
+from io import BytesIO
+
+import pytest
+from openpyxl import load_workbook
+
+from documents import read_sheets, xlsx
+from tablepyxl.rows import rows_to_table
+from tablepyxl.tablepyxl import tables_to_xl
+
+HTML = """<table style="font-size: 12px"><tr style="background-color: #eeeeee"><td rowspan="2">Area</td>
+    <td style="text-align: right; font-weight: bold" class="TYPE_NUMERIC">1,234</td></tr>
+    <tr><td style="text-align: right; color: #ff0000" class="TYPE_NUMERIC">many</td></tr>
+    <tr><td colspan="2">Total</td></tr></table>"""
+
+VALUES = [1, 2.5, Decimal('3.25'), datetime.datetime(2020, 1, 2, 3, 4), True, 'text']
+
+
+def saved(tables, **options):
+    output = BytesIO()
+    tables_to_xl(tables, output, **options)
+    return output.getvalue()
+
+
+def saved_row(tables, **options):
+    return [cell.value for cell in load_workbook(BytesIO(saved(tables, **options))).active[1]]
+
+
+@pytest.mark.parametrize('streaming', [False, True])
+def test_looks_like_the_html_table(streaming):
+    table = rows_to_table(
+        [['Area', '1,234'], ['many'], ['Total']],
+        style='font-size: 12px',
+        row_styles={0: {'background-color': '#eeeeee'}},
+        column_styles={1: 'text-align: right'},
+        cell_styles={(0, 1): 'font-weight: bold', (1, 0): {'text-align': 'right', 'color': '#ff0000'}},
+        spans={(0, 0): (2, 1), (2, 0): (1, 2)},
+        column_classes={1: 'TYPE_NUMERIC'},
+    )
+    assert read_sheets(saved([table], streaming=streaming)) == read_sheets(xlsx(HTML, streaming=streaming))
+
+
+@pytest.mark.parametrize('streaming', [False, True])
+def test_python_values_keep_their_type(streaming):
+    assert saved_row([rows_to_table([VALUES])], streaming=streaming) == [1, 2.5, 3.25, VALUES[3], True, 'text']
+
+
+def test_type_classes_still_convert_text():
+    table = rows_to_table([['1,234', '12%', 'abc']], column_classes=['TYPE_NUMERIC', 'TYPE_PERCENTAGE', 'TYPE_NUMERIC'])
+    assert saved_row([table]) == [1234, 0.12, 'abc']
+
+
+def test_type_classes_leave_typed_values_alone():
+    table = rows_to_table([[7, 0.5]], column_classes=['TYPE_STRING', 'TYPE_PERCENTAGE'])
+    assert saved_row([table]) == [7, 0.5]
+
+
+def test_column_borders_are_drawn():
+    table = rows_to_table([['Rent', 1200], ['Food', 310.5]], column_styles=['border: 1px solid #000000'] * 2)
+    ws = load_workbook(BytesIO(saved([table]))).active
+    assert {(cell.border.left.style, cell.border.bottom.style) for row in ws.iter_rows() for cell in row} == {
+        ('thin', 'thin')}
@@ -0,0 +1,25 @@
+import os
+
+import pytest
+
+from documents import DOCUMENTS
+from tablepyxl.stats import ConversionStats
+from tablepyxl.tablepyxl import document_to_workbook, document_to_xl
+
+
+@pytest.mark.parametrize('options', [{}, {'streaming': True}, {'incremental': True}], ids=str)
+def test_counts(tmp_path, options):
+    filename = str(tmp_path / 'spans.xlsx')
+    stats = ConversionStats()
+    document_to_xl(DOCUMENTS['spans'], filename, stats=stats, **options)
+    assert (stats.tables, stats.rows, stats.cells, stats.merges) == (1, 4, 8, 4)
+    assert stats.styles_created + stats.style_hits > 0
+    assert stats.bytes_written == os.path.getsize(filename)
+    assert 'write' in stats.timings and 'save' in stats.timings
+
+
+def test_observer_is_called_when_a_stage_ends():
+    calls = []
+    document_to_workbook(DOCUMENTS['tables'], observer=lambda stage, seconds, stats: calls.append((stage, stats)))
+    assert [stage for stage, _ in calls] == ['parse', 'stylesheet', 'tables', 'write']
+    assert calls[-1][1].tables == 2
@@ -0,0 +1,174 @@
+import gc
+import threading
+import weakref
+from io import BytesIO
+
+import pytest
+
+from documents import DOCUMENTS, read_sheets, xlsx
+from tablepyxl.stats import ConversionStats
+from tablepyxl.style import Element, StyleRegistry, ValueInterner
+from tablepyxl.tablepyxl import document_to_workbook, get_tables, new_workbook
+
+
+def saved(wb):
+    output = BytesIO()
+    wb.save(output)
+    return output.getvalue()
+
+
+def test_equal_styles_are_shared():
+    registry = StyleRegistry()
+    document_to_workbook(DOCUMENTS['repeated'], registry=registry)
+    assert len(registry) == registry.misses
+    assert registry.hits == 4 * 40 - registry.misses
+
+
+def test_registry_is_bounded():
+    registry = StyleRegistry(maxsize=1)
+    document_to_workbook(DOCUMENTS['basic'], registry=registry)
+    assert len(registry) == 1
+
+
+def test_workbook_can_be_written_to_again():
+    wb = document_to_workbook(DOCUMENTS['basic'])
+    document_to_workbook(DOCUMENTS['stylesheet'], wb=wb)
+    sheets = read_sheets(saved(wb))
+    assert sheets[0] == read_sheets(saved(document_to_workbook(DOCUMENTS['basic'])))[0]
+    assert sheets[1]['cells'] == read_sheets(saved(document_to_workbook(DOCUMENTS['stylesheet'])))[0]['cells']
+
+
+def test_equal_styles_are_resolved_once():
+    rows = get_tables(DOCUMENTS['repeated'])[0].body.rows
+    for column in range(4):
+        assert len({id(row.cells[column].style_dict) for row in rows}) == 1
+    assert rows[0].cells[3].style_dict is not rows[0].cells[0].style_dict
+
+
+def test_resolved_styles_inherit():
+    doc = ('<table style="color: #ff0000"><tr><td style="font-weight: bold; color: #0000ff">x</td><td>y</td></tr>'
+           '</table>')
+    first, second = get_tables(doc)[0].body.rows[0].cells
+    assert (first.style_dict.get('color'), first.style_dict.get('font-weight')) == ('#0000ff', 'bold')
+    assert (second.style_dict.get('color'), second.style_dict.get('font-weight')) == ('#ff0000', None)
+
+
+def test_cells_do_not_keep_the_tree():
+    table = get_tables(DOCUMENTS['spans'])[0]
+    for element in [table, table.body] + table.body.rows + [cell for row in table.body.rows for cell in row.cells]:
+        assert not hasattr(element, '__dict__')
+        assert not hasattr(element, 'element')
+    assert [(cell.rowspan, cell.colspan) for cell in table.body.rows[0].cells][:2] == [(2, 1), (1, 2)]
+
+
+def test_unformatted_text_is_a_plain_string():
+    doc = ('<table><tr><td>all text</td><td>a <b>bold <font color="#ff0000">red</font></b> tail</td><td></td></tr>'
+           '</table>')
+    plain, rich, empty = get_tables(doc)[0].body.rows[0].cells
+    assert (plain.value, empty.value) == ('all text', '')
+    assert [(block.text, bool(block.font.b), block.font.color.rgb if block.font.color else None)
+            for block in rich.value] == [
+        ('a', False, None), ('old', True, None), ('red', True, '00ff0000'), ('tail', False, None)]
+
+
+def test_declarations_are_parsed_once_per_style():
+    Element._declarations.cache_clear()
+    get_tables(DOCUMENTS['repeated'])
+    # The table, its rows, and the plain and the red cells
+    assert Element._declarations.cache_info()[:2] == (1 + 40 + 4 * 40 - 4, 4)
+
+
+@pytest.mark.parametrize('streaming', [False, True])
+@pytest.mark.parametrize('name', sorted(DOCUMENTS))
+def test_named_styles_look_the_same(name, streaming):
+    doc = DOCUMENTS[name]
+    assert read_sheets(xlsx(doc, streaming=streaming, named_styles=True)) == read_sheets(xlsx(doc, streaming=streaming))
+
+
+def test_cells_are_styled_directly():
+    assert len(document_to_workbook(DOCUMENTS['basic']).named_styles) == 1
+    assert len(document_to_workbook(DOCUMENTS['basic'], named_styles=True).named_styles) > 1
+
+
+@pytest.mark.parametrize('shared', [False, True])
+@pytest.mark.parametrize('named_styles', [False, True])
+def test_workbooks_are_not_kept_alive(named_styles, shared):
+    registry = StyleRegistry(named_styles=named_styles) if shared else None
+    workbooks = []
+    for doc in DOCUMENTS.values():
+        wb = document_to_workbook(doc, registry=registry, named_styles=named_styles)
+        workbooks.append(weakref.ref(wb))
+        del wb
+    gc.collect()
+    assert [ref() for ref in workbooks] == [None] * len(DOCUMENTS)
+
+
+def test_named_styles_are_bound_to_each_workbook():
+    registry = StyleRegistry(named_styles=True)
+    first = document_to_workbook(DOCUMENTS['basic'], wb=new_workbook(), registry=registry)
+    arrays = [tuple(style.as_tuple()) for style in first._named_styles]
+    second = document_to_workbook(DOCUMENTS['stylesheet'], wb=new_workbook(), registry=registry)
+    assert [tuple(style.as_tuple()) for style in first._named_styles] == arrays
+    assert all(style._wb is first for style in first._named_styles)
+    assert all(style._wb is second for style in second._named_styles)
+    assert read_sheets(saved(first)) == read_sheets(saved(document_to_workbook(DOCUMENTS['basic'], named_styles=True)))
+
+
+def cell_values(tables):
+    return [cell.value for table in tables for row in table.body.rows for cell in row.cells]
+
+
+@pytest.mark.parametrize('name', sorted(DOCUMENTS))
+def test_interned_values_are_equal(name):
+    doc = DOCUMENTS[name]
+    assert cell_values(get_tables(doc, ValueInterner())) == cell_values(get_tables(doc))
+
+
+def test_equal_values_are_shared():
+    values = ValueInterner()
+    rows = get_tables(DOCUMENTS['repeated'], values)[0].body.rows
+    for column in range(4):
+        firsts = {}
+        for row in rows:
+            value = row.cells[column].value
+            assert firsts.setdefault(repr(value), value) is value
+    assert len(values) == 3 + 1 + 4 + 1
+    assert values.hits == 4 * 40 - len(values)
+
+
+def test_interner_is_bounded():
+    values = ValueInterner(maxsize=2)
+    assert [values.text(text) for text in 'abcab'] == list('abcab')
+    assert len(values) == 2
+    assert (values.hits, values.misses) == (2, 3)
+
+
+@pytest.mark.parametrize('engine', ['openpyxl', 'fast'])
+def test_stats_count_values(engine):
+    stats = ConversionStats()
+    xlsx(DOCUMENTS['repeated'], engine=engine, stats=stats)
+    assert stats.values_created == 9
+    assert stats.value_hits == 4 * 40 - 9
+
+
+def test_registry_is_shared_between_threads():
+    registry = StyleRegistry()
+    errors = []
+
+    def convert():
+        try:
+            for doc in DOCUMENTS.values():
+                document_to_workbook(doc, wb=new_workbook(), registry=registry)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=convert) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    expected = StyleRegistry()
+    for doc in DOCUMENTS.values():
+        document_to_workbook(doc, wb=new_workbook(), registry=expected)
+    assert len(registry) == len(expected)
@@ -0,0 +1,123 @@
+from io import BytesIO
+from zipfile import ZIP_STORED, ZipFile
+
+import pytest
+from openpyxl.cell import Cell
+
+from documents import DOCUMENTS, read_sheets, xlsx
+from tablepyxl.stats import ConversionStats
+from tablepyxl.style import TableCell
+from tablepyxl.tablepyxl import document_to_bytes, document_to_workbook, document_to_xl
+
+
+@pytest.mark.parametrize('name', sorted(DOCUMENTS))
+def test_converts(name):
+    sheets = read_sheets(xlsx(DOCUMENTS[name]))
+    assert len(sheets) == 1
+    assert sheets[0]['cells']
+
+
+@pytest.mark.parametrize('name', sorted(DOCUMENTS))
+def test_streaming_writes_the_same(name):
+    doc = DOCUMENTS[name]
+    assert read_sheets(xlsx(doc, streaming=True)) == read_sheets(xlsx(doc))
+
+
+def test_streaming_workbook_is_write_only():
+    wb = document_to_workbook(DOCUMENTS['basic'], streaming=True)
+    assert wb.write_only
+    output = BytesIO()
+    wb.save(output)
+    assert read_sheets(output.getvalue())[0]['cells']
+
+
+@pytest.mark.parametrize('streaming', [False, True])
+def test_spans_are_merged(streaming):
+    sheets = read_sheets(xlsx(DOCUMENTS['spans'], streaming=streaming))
+    assert sheets[0]['merges'] == ['A1:A2', 'A4:D4', 'B1:C1', 'C2:D3']
+
+
+@pytest.mark.parametrize('streaming', [False, True])
+def test_rowspan_past_the_last_row(streaming):
+    doc = '<table><tr><td rowspan="3">a</td><td>x</td></tr></table>'
+    assert read_sheets(xlsx(doc, streaming=streaming))[0]['merges'] == ['A1:A3']
+
+
+@pytest.mark.parametrize('streaming', [False, True])
+def test_frame_replaces_the_sides_it_covers(streaming):
+    cells = read_sheets(xlsx(DOCUMENTS['framed'], streaming=streaming))[0]['cells']
+    top, left = ('medium', '00ff0000'), ('dashed', '000000ff')
+    assert cells['A1'][5] == [left, None, top, None]
+    assert cells['A2'][5] == [left, None, ('dotted', '00ff0000'), None]
+    # The rowspan reaches a row without cells of its own, which is still framed
+    assert cells['A3'] == [None, None, [left, None, None, None]]
+
+
+@pytest.mark.parametrize('streaming', [False, True])
+def test_frame_cells_are_styled_once(monkeypatch, streaming):
+    styled = []
+    format_cell = TableCell.format
+
+    def format_once(table_cell, cell, *args):
+        styled.append(table_cell.value)
+        format_cell(table_cell, cell, *args)
+
+    monkeypatch.setattr(TableCell, 'format', format_once)
+    # Their border is part of their style, it is not set again afterwards
+    monkeypatch.setattr(Cell, 'border', property(lambda cell: None, lambda cell, border: styled.append(border)),
+                        raising=False)
+    rows = ''.join('<tr>{}</tr>'.format(''.join('<td>{}</td>'.format(row * 3 + column) for column in range(3)))
+                   for row in range(3))
+    xlsx('<table style="border-top-style: dotted; border-left-style: dashed">{}</table>'.format(rows),
+         streaming=streaming)
+    assert sorted(styled) == [str(value) for value in range(9)]
+
+
+class Stream(object):
+    # A binary stream that can only be written to, like a socket or a pipe
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+
+def test_writes_to_non_seekable_streams():
+    stream = Stream()
+    document_to_xl(DOCUMENTS['basic'], stream)
+    assert read_sheets(b''.join(stream.chunks)) == read_sheets(xlsx(DOCUMENTS['basic']))
+
+
+def test_stats_of_non_seekable_streams():
+    stats = ConversionStats()
+    document_to_xl(DOCUMENTS['basic'], Stream(), stats=stats)
+    assert stats.bytes_written is None
+    assert 'save' in stats.timings
+
+
+def test_compresslevel():
+    stored = document_to_bytes(DOCUMENTS['repeated'], compresslevel=0)
+    with ZipFile(BytesIO(stored)) as archive:
+        assert {info.compress_type for info in archive.infolist()} == {ZIP_STORED}
+    smallest = document_to_bytes(DOCUMENTS['repeated'], compresslevel=9)
+    assert len(smallest) < len(stored)
+    assert read_sheets(smallest) == read_sheets(stored) == read_sheets(xlsx(DOCUMENTS['repeated']))
+
+
+def test_bytes_written():
+    output = BytesIO(b'header')
+    output.seek(0, 2)
+    stats = ConversionStats()
+    document_to_xl(DOCUMENTS['basic'], output, stats=stats)
+    assert stats.bytes_written == len(output.getvalue()) - len(b'header')
+
+
+def test_filename_keyword(tmp_path):
+    filename = str(tmp_path / 'basic.xlsx')
+    document_to_xl(DOCUMENTS['basic'], filename=filename)
+    with open(filename, 'rb') as f:
+        assert read_sheets(f.read()) == read_sheets(xlsx(DOCUMENTS['basic']))
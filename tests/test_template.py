@@ -0,0 +1,34 @@
+import pytest
+
+from documents import DOCUMENTS, read_sheets, xlsx
+from tablepyxl.template import Template
+
+REPORT = ('<style>.total {{ font-weight: bold }}</style><table><tr><th>Region</th><th>Amount</th></tr>'
+          '<tr><td>{}</td><td class="TYPE_NUMERIC">{}</td></tr>'
+          '<tr class="total"><td>Total</td><td class="TYPE_NUMERIC" style="color: #ff0000">{}</td></tr></table>')
+
+
+@pytest.mark.parametrize('options', [{}, {'streaming': True}], ids=str)
+@pytest.mark.parametrize('name', sorted(DOCUMENTS))
+def test_renders_the_document_it_was_compiled_from(name, options):
+    doc = DOCUMENTS[name]
+    assert read_sheets(xlsx(doc, template=Template(doc), **options)) == read_sheets(xlsx(doc, **options))
+
+
+def test_renders_other_values():
+    template = Template(REPORT.format('North', '1,234', '1,234'))
+    doc = REPORT.format('South <b>side</b>', 'many', '12.5')
+    assert template.render(doc) is not None
+    assert read_sheets(xlsx(doc, template=template)) == read_sheets(xlsx(doc))
+
+
+def test_other_structures_are_converted_as_usual():
+    template = Template(REPORT.format('North', '1', '1'))
+    doc = REPORT.format('North', '1', '1').replace('<tr class="total">', '<tr>')
+    assert template.render(doc) is None
+    assert read_sheets(xlsx(doc, template=template)) == read_sheets(xlsx(doc))
+
+
+def test_linked_stylesheets_are_never_matched():
+    doc = '<link rel="stylesheet" href="x.css">' + REPORT.format('North', '1', '1')
+    assert Template(doc).render(doc) is None
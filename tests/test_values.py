@@ -0,0 +1,54 @@
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+from openpyxl.styles.numbers import FORMAT_CURRENCY_USD_SIMPLE
+
+from documents import read_sheets, xlsx
+from tablepyxl.values import parse_decimal, to_date, to_number, to_percentage
+
+
+@pytest.mark.parametrize('text, number', [
+    ('1,234', '1234'),
+    ('1,234,567.5', '1234567.5'),
+    ('1.234.567', '1234567'),
+    ("1'234.5", '1234.5'),
+    ('1 234,5', '1234.5'),
+    ('1.234,5', '1234.5'),
+    ('1,5', '1.5'),
+    ('1.234', '1.234'),
+    ('.5', '0.5'),
+    ('+7', '7'),
+    ('(12)', '-12'),
+    ('($1,234)', '-1234'),
+    ('-$1,234.50', '-1234.50'),
+    ('(-3)', '3'),
+])
+def test_parse_decimal(text, number):
+    assert parse_decimal(text) == Decimal(number)
+
+
+@pytest.mark.parametrize('text', ['', 'abc', '1e5', '1.2.3', '12,34,5', '1,234.5.6'])
+def test_parse_decimal_rejects(text):
+    assert parse_decimal(text) is None
+
+
+def test_converters():
+    assert (to_number('1,234'), to_number('1.5')) == (1234, 1.5)
+    assert isinstance(to_number('1,234'), int)
+    assert (to_percentage('25%'), to_percentage('0.3')) == (0.25, 0.3)
+    assert to_date('Jan 2, 2024') == to_date('2024-01-02') == datetime(2024, 1, 2)
+
+
+def test_typed_cells():
+    doc = ('<table><tr><td class="TYPE_NUMERIC">1,234</td><td class="TYPE_CURRENCY">$1.10</td>'
+           '<td class="TYPE_PERCENTAGE">25%</td><td class="TYPE_DATE">2024-01-02</td>'
+           '<td class="TYPE_NUMERIC">many</td></tr></table>')
+    cells = read_sheets(xlsx(doc))[0]['cells']
+    assert [cells[column + '1'][:3] for column in 'ABCDE'] == [
+        ['1234', 'n', '#,##0'],
+        ['1.1', 'n', FORMAT_CURRENCY_USD_SIMPLE],
+        ['0.25', 'n', '0%'],
+        [repr(datetime(2024, 1, 2)), 'd', 'mm/dd/yyyy'],
+        ["'many'", 's', 'General'],
+    ]